@@ -1,31 +1,135 @@
-import os.path
+from __future__ import annotations
 
-import saihu.xtfa.networks as xtfa_networks
-import saihu.xtfa.fasUtility as xtfa_fasUtility
+import os.path
 
-from saihu.Linear_TFA.Linear_TFA import Linear_TFA
 from saihu.netscript.netscript import *
 from saihu.javapy.dnc_exe import dnc_exe
 from saihu.panco.panco_analyzer import panco_analyzer
 from saihu.result import TSN_result
+from saihu.mdwriter import MdWriter
 import saihu.netscript.unit_util as unit_util
 
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hashlib import sha1
 from enum import Enum
 from time import time
-from typing import Union
+from typing import Union, TYPE_CHECKING
 from collections.abc import Iterable
 import json
 import networkx as nx
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 import numpy as np
-from mdutils.mdutils import MdUtils as mdu
-import matplotlib.pyplot as plt
+
+# xTFA (which loads matplotlib), the linear solver and matplotlib for reports are imported when used
+# to keep the import of the interface light when only some of the tools are needed
+if TYPE_CHECKING:
+    import saihu.xtfa.networks as xtfa_networks
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-1 digest of the content of a file
+    """
+    with open(path, "rb") as f:
+        return sha1(f.read()).hexdigest()
 
 
-def list_update_none(x1: list, x2: list) -> list:
+def graph_from_adjacency(adjacency_mat, server_names: list) -> nx.DiGraph:
     """
-    Replace None element in x1 with x2 with the same index
+    Create a directed graph from an adjacency matrix with nodes named by server_names.
+    Edges are weighted by the matrix entries, only the non-zero entries are visited.
+    Nodes without a name keep their index as name.
     """
-    return [x2[i] if x is None and i < len(x2) else x for i, x in enumerate(x1)]
+    adjacency_mat = np.asarray(adjacency_mat)
+    num_nodes = len(adjacency_mat)
+    names = [*server_names[:num_nodes], *range(len(server_names), num_nodes)]
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(names)
+    rows, cols = np.nonzero(adjacency_mat)
+    graph.add_weighted_edges_from(
+        zip(
+            [names[r] for r in rows.tolist()],
+            [names[c] for c in cols.tolist()],
+            adjacency_mat[rows, cols].tolist(),
+        )
+    )
+    return graph
+
+
+def list_update_none(x1: list, *x2: list) -> list:
+    """
+    Replace None element in x1 with the first non-None element of the lists in x2 with the same index
+
+    Only the indices still being None are visited for each list in x2
+    """
+    x1 = list(x1)
+    missing = [i for i, x in enumerate(x1) if x is None]
+    for xi in x2:
+        if len(missing) == 0:
+            break
+        still_missing = list()
+        for i in missing:
+            if i < len(xi) and xi[i] is not None:
+                x1[i] = xi[i]
+            else:
+                still_missing.append(i)
+        missing = still_missing
+    return x1
+
+
+# Attributes to build a per server result table for each target
+# key=target ; value=(title name, result attribute, summary label, summary attribute, multiplier attribute, unit)
+server_result_targets = {
+    "delay": (
+        "delay",
+        "server_delays",
+        "Total",
+        "total_delay",
+        "serv_delay_mul",
+        "second",
+    ),
+    "backlog": (
+        "backlog",
+        "server_backlogs",
+        "Max",
+        "max_backlog",
+        "backlog_mul",
+        "bit",
+    ),
+}
+
+
+# Multipliers shared by all the results of an analyzer
+result_multiplier_attrs = (
+    "serv_delay_mul",
+    "flow_delay_mul",
+    "backlog_mul",
+    "exec_time_mul",
+)
+
+
+def _analyze_in_worker(
+    analyze_name: str, temp_path: str, shaping: str, kwargs: dict
+) -> tuple:
+    """
+    Execute one "analyze_xxx" method of a fresh analyzer, used as a task of a process pool
+
+    Returns:
+    -------------
+    results: list of results obtained by the analysis
+    muls: dictionary with key=multiplier attribute & value=multiplier decided by the analysis
+    """
+    analyzer = TSN_Analyzer(temp_path=temp_path, shaping=shaping)
+    getattr(analyzer, analyze_name)(**kwargs)
+    return analyzer.results, {
+        attr: getattr(analyzer, attr) for attr in result_multiplier_attrs
+    }
 
 
 class FORCE_SHAPER(Enum):
@@ -52,12 +156,16 @@ class TSN_Analyzer:
     backlog_mul    : Backlog multiplier for all the loaded results (not used)
     exec_time_mul  : Multiplier for execution time by each analysis
     output_shaping     : Enum number to choose use shaper or not
+    _mapping_cache : Mappings created while writing a report, key=(ids of elements, attribute name, start index)
+    _converted_cache : Digest of converted files, key=(operation, input file, input digest, output file)
+    _graph_signatures : Topology drawn in each graph image, key=image path ; value=(nodes, sorted edges)
 
     Methods:
     --------------
     set_shaping_mode  : Select whether to use shaper. Can be "AUTO", "ON", or "OFF"
     convert_netfile   : Convert a netfile into both physical and output-port network from either format
     analyze_all       : Analyze the network with all tools available
+    analyze_all_async : Coroutine analyzing the network with all tools concurrently
     analyze_xtfa      : Analyze the network with xTFA
     analyze_linear    : Analyze the network with linear TFA solver
     analyze_panco     : Analyze the network with panco FIFO analyzer
@@ -102,6 +210,9 @@ class TSN_Analyzer:
         self.flow_delay_mul = None
         self.backlog_mul = None
         self.exec_time_mul = None
+        self._mapping_cache = dict()
+        self._converted_cache = dict()
+        self._graph_signatures = dict()
         self.set_shaping_mode(shaping)
 
     def clear(self) -> None:
@@ -284,6 +395,8 @@ class TSN_Analyzer:
         comment: [str] a comment written at the beginning of the report
         clear: (Optional) [bool] Clear all content after finishing writing report. Default is True
         """
+        import matplotlib.pyplot as plt
+
         print(f'Writing Markdown report "{output_file}"...', end="")
 
         if len(self.results) == 0:
@@ -291,6 +404,7 @@ class TSN_Analyzer:
             return
 
         outpath = os.path.abspath(os.path.dirname(output_file))
+        self._mapping_cache = dict()
         ## Start writing
         # Resolve the number of networks in results
         networks = dict()
@@ -303,31 +417,18 @@ class TSN_Analyzer:
         # We summarize one output file for each network
         for net_name, res in networks.items():
             # Results are named as "tool-method" but they are sorted by "method/tool" in alphabetical order
-            res_sorted = dict(
-                zip(["{m}{t}".format(t=r.tool, m=r.method) for r in res], res)
-            )
-            res_sorted = dict(sorted(res_sorted.items()))
-            res_sorted = dict(
-                zip(
-                    [
-                        "{t}-{m}".format(t=r.tool, m=r.method)
-                        for r in res_sorted.values()
-                    ],
-                    res_sorted.values(),
-                )
-            )
+            res_by_method_tool = {f"{r.method}{r.tool}": r for r in res}
+            res_sorted = {
+                f"{r.tool}-{r.method}": r for _, r in sorted(res_by_method_tool.items())
+            }
 
             # Obtain smallest unit as the unit of display (less decimal points)
-            self._units = self._get_smallest_unit(res)
+            timeunit = unit_util.split_multiplier_unit(
+                self._get_smallest_unit(res)["time"]
+            )[1]
             self._units = {
-                "flow_delay": "{m}{u}".format(
-                    m=self.flow_delay_mul,
-                    u=unit_util.split_multiplier_unit(self._units["time"])[1],
-                ),
-                "server_delay": "{m}{u}".format(
-                    m=self.serv_delay_mul,
-                    u=unit_util.split_multiplier_unit(self._units["time"])[1],
-                ),
+                "flow_delay": "{m}{u}".format(m=self.flow_delay_mul, u=timeunit),
+                "server_delay": "{m}{u}".format(m=self.serv_delay_mul, u=timeunit),
             }
 
             # Determine report filename
@@ -337,7 +438,9 @@ class TSN_Analyzer:
             output_index += 1
 
             # Create the output Markdown file to write
-            mdFile = mdu(file_name=output_file, title=f'Analysis Report - "{net_name}"')
+            mdFile = MdWriter(
+                file_name=output_file, title=f'Analysis Report - "{net_name}"'
+            )
             mdFile.new_paragraph(
                 "The is a automatically generated report with [Saihu](https://github.com/adfeel220/Saihu-TSN-Analysis-Tool-Integration)\n"
             )
@@ -378,11 +481,21 @@ class TSN_Analyzer:
                     graph = r.graph
                     break
             if graph is not None:
-                fig, ax = plt.subplots()
-                nx.draw(graph, with_labels=True)
                 graph_file_path = os.path.join(outpath, f"{net_name}_topo.png")
-                fig.savefig(graph_file_path, dpi=300, bbox_inches="tight")
-                plt.close(fig)
+                # Skip drawing if the same topology is already rendered in this file
+                graph_signature = (tuple(graph.nodes), tuple(sorted(graph.edges)))
+                already_drawn = os.path.exists(graph_file_path) and (
+                    self._graph_signatures.get(graph_file_path, None) == graph_signature
+                )
+                if not already_drawn:
+                    fig, ax = plt.subplots()
+                    # a seeded layout keeps the same drawing for the same topology
+                    pos = nx.spring_layout(graph, seed=0)
+                    nx.draw_networkx(graph, pos, ax=ax, with_labels=True)
+                    ax.set_axis_off()
+                    fig.savefig(graph_file_path, dpi=150, bbox_inches="tight")
+                    plt.close(fig)
+                    self._graph_signatures[graph_file_path] = graph_signature
 
                 mdFile.new_header(level=2, title="Network Topology")
                 mdFile.new_line(
@@ -401,6 +514,9 @@ class TSN_Analyzer:
             mdFile.new_table_of_contents(table_title="Table of Contents", depth=2)
             mdFile.create_md_file()
 
+        # The mappings refer to the results by their ids, drop them with the report
+        self._mapping_cache = dict()
+
         # Clear the current results
         if clear:
             self.clear()
@@ -413,6 +529,7 @@ class TSN_Analyzer:
         netfile: str = None,
         use_tfa: bool = True,
         use_sfa: bool = True,
+        max_workers: int = None,
     ) -> int:
         """
         Analyze the network with 4 methods: DNC, xTFA, Linear Solver, and panco
@@ -424,25 +541,116 @@ class TSN_Analyzer:
         methods: (Optional) [list | str] List of methods "TFA", "SFA", "PLP", etc. Or a single string of one of the method.
                  Default is None, it executes all available methods
         use_tfa, use_sfa: (Optional) [bool] to use TFA and/or SFA in panco PLP analysis.
+        max_workers: (Optional) [int] Number of processes to run the tools concurrently.
+                     Default is None, the tools are executed one after another
 
         Return:
         -------------
         result_num: Number of results loaded from execution
         """
-        if netfile is None:
-            if self.netfile is None:
-                raise RuntimeError("No network definition file loaded")
-            netfile = self.netfile
-
-        op_net_path, phy_net_path = self.convert_netfile(netfile)
+        netfile = self._analyze_all_netfile(netfile)
+        tasks = self._analyze_all_tasks(methods, use_tfa, use_sfa)
 
         start_res_num = len(self.results)
-        self.analyze_panco(
-            netfile=op_net_path, methods=methods, use_tfa=use_tfa, use_sfa=use_sfa
+        if max_workers is None or max_workers <= 1:
+            # The given format is analyzed while the other one is converted aside,
+            # the conversion has its own handler as the tools keep using the analyzer's one
+            paths = {"xml" if netfile.endswith("xml") else "json": netfile}
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                conversion = executor.submit(
+                    self.convert_netfile,
+                    netfile,
+                    script_handler=NetworkScriptHandler(),
+                    verbose=False,
+                )
+                for analyze_name, kwargs, net_format in tasks:
+                    if net_format not in paths:
+                        paths = dict(zip(("json", "xml"), conversion.result()))
+                    getattr(self, analyze_name)(netfile=paths[net_format], **kwargs)
+                # Raise a failed conversion even if no tool needed the converted file
+                conversion.result()
+            return len(self.results) - start_res_num
+
+        paths = dict(zip(("json", "xml"), self.convert_netfile(netfile)))
+
+        # Each tool writes its own temporary files, tools are independent until results are gathered
+        with ProcessPoolExecutor(
+            max_workers=min(len(tasks), max_workers, os.cpu_count() or 1)
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _analyze_in_worker,
+                    analyze_name,
+                    self._temp_path,
+                    self.shaping.name,
+                    dict(kwargs, netfile=paths[net_format]),
+                )
+                for analyze_name, kwargs, net_format in tasks
+            ]
+            # Gather in submission order to keep the same result order as sequential execution
+            for future in futures:
+                self._merge_worker_result(*future.result())
+
+        return len(self.results) - start_res_num
+
+    async def analyze_all_async(
+        self,
+        methods: Union[list, str] = None,
+        netfile: str = None,
+        use_tfa: bool = True,
+        use_sfa: bool = True,
+        max_workers: int = None,
+    ) -> int:
+        """
+        Coroutine version of "analyze_all", the tools are executed concurrently in worker processes
+        so that the event loop stays free while waiting for the JVM or the solvers
+
+        Parameters:
+        -------------
+        netfile: (Optional) [str] File name of the network definition, must in either WOPANet XML format or output-port JSON.
+                 Default is to select the netfile stored in the class, raise error if both are not defined.
+        methods: (Optional) [list | str] List of methods "TFA", "SFA", "PLP", etc. Or a single string of one of the method.
+                 Default is None, it executes all available methods
+        use_tfa, use_sfa: (Optional) [bool] to use TFA and/or SFA in panco PLP analysis.
+        max_workers: (Optional) [int] Number of worker processes. Default is None, one process per tool
+
+        Return:
+        -------------
+        result_num: Number of results loaded from execution
+        """
+        loop = asyncio.get_running_loop()
+        # The conversion writes files, run it aside from the event loop as well
+        netfile = self._analyze_all_netfile(netfile)
+        paths = dict(
+            zip(
+                ("json", "xml"),
+                await loop.run_in_executor(None, self.convert_netfile, netfile),
+            )
         )
-        self.analyze_dnc(netfile=op_net_path, methods=methods)
-        # self.analyze_linear(netfile=op_net_path, methods=methods)
-        self.analyze_xtfa(netfile=phy_net_path, methods=methods)
+        tasks = self._analyze_all_tasks(methods, use_tfa, use_sfa)
+
+        start_res_num = len(self.results)
+        if max_workers is None:
+            max_workers = len(tasks)
+        with ProcessPoolExecutor(
+            max_workers=min(len(tasks), max(max_workers, 1), os.cpu_count() or 1)
+        ) as executor:
+            worker_results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        _analyze_in_worker,
+                        analyze_name,
+                        self._temp_path,
+                        self.shaping.name,
+                        dict(kwargs, netfile=paths[net_format]),
+                    )
+                    for analyze_name, kwargs, net_format in tasks
+                )
+            )
+        # gather keeps the submission order
+        for results, muls in worker_results:
+            self._merge_worker_result(results, muls)
 
         return len(self.results) - start_res_num
 
@@ -459,6 +667,9 @@ class TSN_Analyzer:
         methods: (Optional) [list | str] List of "TFA", "SFA", or "PLP", or a single string of one of the method. Ignores methods other than TFA
                  Default is None, it executes all available methods
         """
+        import saihu.xtfa.networks as xtfa_networks
+        import saihu.xtfa.fasUtility as xtfa_fasUtility
+
         if methods is None:
             methods = ["TFA"]
 
@@ -481,12 +692,18 @@ class TSN_Analyzer:
                 exclude_tech = ["IS", "ARBITRARY"]
 
             # xTFA use the "technology" entry defined in the file for shaper usage, generate a new file that enforces the shaper technology
-            file_enforce_method = self.script_handler.enforce_technology(
-                in_filename=netfile,
-                include_tech=include_tech,
-                exclude_tech=exclude_tech,
-                out_filename=add_text_in_ext(
-                    os.path.join(self._temp_path, "tempnet.xml"), "enforced"
+            file_enforce_method = add_text_in_ext(
+                os.path.join(self._temp_path, "tempnet.xml"), "enforced"
+            )
+            self._convert_once(
+                ("enforce_technology", tuple(include_tech), tuple(exclude_tech)),
+                netfile,
+                file_enforce_method,
+                lambda: self.script_handler.enforce_technology(
+                    in_filename=netfile,
+                    include_tech=include_tech,
+                    exclude_tech=exclude_tech,
+                    out_filename=file_enforce_method,
                 ),
             )
             try:
@@ -569,11 +786,7 @@ class TSN_Analyzer:
                         else serv["name"]
                         for serv in jsonnet.servers
                     ]
-                    graph = nx.from_numpy_array(
-                        jsonnet.adjacency_mat, create_using=nx.DiGraph
-                    )
-                    name_mapping = dict(zip(range(len(server_names)), server_names))
-                    graph = nx.relabel_nodes(graph, name_mapping)
+                    graph = graph_from_adjacency(jsonnet.adjacency_mat, server_names)
                 else:
                     server_names = [serv["name"] for serv in jsonnet.servers]
                     graph = nx.DiGraph(xtfa_net.gif.subgraph(server_names))
@@ -615,6 +828,8 @@ class TSN_Analyzer:
         methods: (Optional) [list | str] List of "TFA", "SFA", or "PLP", or a single string of one of the method. Ignores methods other than TFA
                  Default is None, it executes all available methods
         """
+        from saihu.Linear_TFA.Linear_TFA import Linear_TFA
+
         if methods is None:
             methods = ["TFA"]
         netfile, methods = self._arg_check(netfile, methods, "json")
@@ -649,11 +864,12 @@ class TSN_Analyzer:
                 self.exec_time_mul = mul
 
             # Get server info
-            server_delays = dict()
-            server_names = list()
-            for serv_id, server in enumerate(linear_solver.servers):
-                server_names.append(server.get("name", f"s{serv_id}"))
-                server_delays[server_names[-1]] = delays[serv_id]
+            delays = np.asarray(delays, dtype=np.float64)
+            server_names = [
+                server.get("name", f"s{serv_id}")
+                for serv_id, server in enumerate(linear_solver.servers)
+            ]
+            server_delays = dict(zip(server_names, delays.tolist()))
             # determine min multiplier
             min_mul = unit_util.decide_min_multiplier(
                 server_delays.values(), unit=linear_solver.units["time"]
@@ -668,16 +884,16 @@ class TSN_Analyzer:
 
             # Get flow info
             flow_paths = dict()
+            flow_cmu_delays = dict()
             flow_delays = dict()
             for flow_id, flow in enumerate(linear_solver.flows):
                 flow_name = flow.get("name", f"fl_{flow_id}")
-                flow_paths[flow_name] = list()
-
-                delay = 0
-                for serv_id in flow["path"]:  # list of server indices
-                    flow_paths[flow_name].append(server_names[serv_id])
-                    delay += delays[serv_id]
-                flow_delays[flow_name] = delay
+                path = flow["path"]  # list of server indices
+                flow_paths[flow_name] = [server_names[serv_id] for serv_id in path]
+                flow_cmu_delays[flow_name] = np.cumsum(delays[path]).tolist()
+                flow_delays[flow_name] = (
+                    flow_cmu_delays[flow_name][-1] if len(path) > 0 else 0.0
+                )
 
             # determine delay multiplier
             min_mul = unit_util.decide_min_multiplier(
@@ -692,11 +908,7 @@ class TSN_Analyzer:
                 self.flow_delay_mul = min_mul
 
             # Create a directed graph
-            net_graph = nx.from_numpy_array(
-                linear_solver.adjacency_mat, create_using=nx.DiGraph
-            )
-            graph_name_mapping = dict(zip(list(range(len(server_names))), server_names))
-            net_graph = nx.relabel_nodes(net_graph, graph_name_mapping)
+            net_graph = graph_from_adjacency(linear_solver.adjacency_mat, server_names)
 
             # Create a result container
             result = TSN_result(
@@ -706,6 +918,7 @@ class TSN_Analyzer:
                 graph=net_graph,
                 server_delays=server_delays,
                 flow_paths=flow_paths,
+                flow_cmu_delays=flow_cmu_delays,
                 flow_delays=flow_delays,
                 exec_time=exec_time,
                 units=linear_solver.units,
@@ -824,13 +1037,9 @@ class TSN_Analyzer:
                 self.flow_delay_mul = min_mul
 
             # Create a directed graph
-            net_graph = nx.from_numpy_array(
-                panco_anzr.adjacency_mat, create_using=nx.DiGraph
-            )
-            graph_name_mapping = dict(
-                zip(list(range(len(panco_anzr.server_names))), panco_anzr.server_names)
+            net_graph = graph_from_adjacency(
+                panco_anzr.adjacency_mat, panco_anzr.server_names
             )
-            net_graph = nx.relabel_nodes(net_graph, graph_name_mapping)
 
             # Create a result container
             result = TSN_result(
@@ -853,7 +1062,12 @@ class TSN_Analyzer:
         print("Done")
 
     def analyze_dnc(
-        self, methods: Union[list, str] = None, netfile: str = None
+        self,
+        methods: Union[list, str] = None,
+        netfile: str = None,
+        use_cache: bool = False,
+        invalidate_cache: bool = False,
+        jvm_options: tuple = (),
     ) -> None:
         """
         Analyze the network with xTFA
@@ -864,6 +1078,12 @@ class TSN_Analyzer:
                  Default is to select the netfile stored in the class, raise error if both are not defined.
         methods: (Optional) [list | str] List of "TFA", "SFA", "PMOO", "TMA" or "LUDB", or a single string of one of the method.
                  Default is None, it executes all available methods
+        use_cache: (Optional) [bool] Reuse the DNC output of a previous execution on the same network, methods and DNC jar,
+                   the outputs are stored in "dnc_cache" of the temp path. The execution times reported are then
+                   the ones of the execution that produced the output. Default is False
+        invalidate_cache: (Optional) [bool] Execute DNC and overwrite the cached output even if it exists. Default is False
+        jvm_options: (Optional) [tuple] Options given to the JVM running DNC, e.g. ("-XX:TieredStopAtLevel=1",) to only use
+                     the quick JIT compiler, which speeds up short analyses but slows down long ones. Default is no option
         """
         if methods is None:
             methods = ["TFA", "SFA", "PMOO", "TMA", "LUDB"]
@@ -914,13 +1134,22 @@ class TSN_Analyzer:
         self.script_handler.op_net.dump_json(formatted_net_name)
 
         try:
-            dnc_result_json_str = dnc_exe(formatted_net_name, self._jar_path, methods)
+            dnc_result_lines = dnc_exe(
+                formatted_net_name,
+                self._jar_path,
+                methods,
+                cache_dir=(
+                    os.path.join(self._temp_path, "dnc_cache") if use_cache else None
+                ),
+                invalidate=invalidate_cache,
+                jvm_options=jvm_options,
+            )
+            # parse individual flows/methods into dictionaries while DNC is running
+            result_by_methods = self._split_dnc_result(dnc_result_lines)
         except Exception as e:
             print("Skip. Cannot execute DNC due to\n{}".format(e))
             return
 
-        # parse individual flows/methods into dictionaries
-        result_by_methods = self._split_dnc_result(dnc_result_json_str)
         if len(result_by_methods) == 0:
             print("No result obtained from DNC, Skip")
             return
@@ -991,7 +1220,7 @@ class TSN_Analyzer:
                 unit_util.multipliers[min_mul] < unit_util.multipliers[self.backlog_mul]
             ):
                 self.backlog_mul = min_mul
-            max_backlogs = list()
+            max_backlogs = np.empty(len(res_per_method) - 1, dtype=np.float64)
 
             flow_name = res_per_method[0]["flow_name"]
             result["flow_paths"] = dict()
@@ -1009,20 +1238,31 @@ class TSN_Analyzer:
             elif unit_util.multipliers[mul] < unit_util.multipliers[self.exec_time_mul]:
                 self.exec_time_mul = mul
 
-            for res_per_flow in res_per_method[1:]:
+            # Merge all other flows in one pass, fields are bound to locals outside the loop
+            flow_paths = result["flow_paths"]
+            flow_cmu_delays = result["flow_cmu_delays"]
+            flow_delays = result["flow_delays"]
+            server_delays = result["server_delays"]
+            server_backlogs = result["server_backlogs"]
+            exec_time = result["exec_time"]
+            for i, res_per_flow in enumerate(res_per_method[1:]):
                 flow_name = res_per_flow["flow_name"]
-                result["flow_paths"][flow_name] = res_per_flow["flow_paths"]
-                result["flow_cmu_delays"][flow_name] = res_per_flow["flow_cmu_delays"]
-                result["flow_delays"][flow_name] = res_per_flow["flow_delays"]
+                flow_paths[flow_name] = res_per_flow["flow_paths"]
+                flow_cmu_delays[flow_name] = res_per_flow["flow_cmu_delays"]
+                flow_delays[flow_name] = res_per_flow["flow_delays"]
 
-                result["server_delays"].update(res_per_flow["server_delays"])
-                result["server_backlogs"].update(res_per_flow["server_backlogs"])
+                server_delays.update(res_per_flow["server_delays"])
+                server_backlogs.update(res_per_flow["server_backlogs"])
 
-                server_names = list_update_none(
-                    server_names, res_per_flow["server_names"]
-                )
-                max_backlogs.append(float(res_per_flow["max_backlog"]))
-                result["exec_time"] += res_per_flow["exec_time"]
+                max_backlogs[i] = res_per_flow["max_backlog"]
+                exec_time += res_per_flow["exec_time"]
+            result["exec_time"] = exec_time
+
+            # fill in the server names unknown to the first flow in one pass
+            server_names = list_update_none(
+                server_names,
+                *(res_per_flow["server_names"] for res_per_flow in res_per_method[1:]),
+            )
 
             if len(result["server_delays"]) == 0:
                 result["server_delays"] = None
@@ -1040,19 +1280,18 @@ class TSN_Analyzer:
                 self.flow_delay_mul = min_mul
 
             # Check empty result, change to None if all empty
-            if all([len(delays) == 0 for delays in result["flow_cmu_delays"].values()]):
+            if all(len(delays) == 0 for delays in result["flow_cmu_delays"].values()):
                 result["flow_cmu_delays"] = None
 
             if len(max_backlogs) > 0:
-                result["max_backlog"] = max(max_backlogs)
+                result["max_backlog"] = float(max_backlogs.max())
             else:
                 result["max_backlog"] = None
 
             # Create a directed graph
-            adj_mat = np.array(res_per_method[0]["adjacency_matrix"])
-            result["graph"] = nx.from_numpy_array(adj_mat, create_using=nx.DiGraph)
-            graph_name_mapping = dict(zip(list(range(len(server_names))), server_names))
-            result["graph"] = nx.relabel_nodes(result["graph"], graph_name_mapping)
+            result["graph"] = graph_from_adjacency(
+                res_per_method[0]["adjacency_matrix"], server_names
+            )
 
             result["network_source"] = netfile
             result["converted_from"] = self.script_handler.get_network_info(
@@ -1065,7 +1304,12 @@ class TSN_Analyzer:
         print("Done")
 
     def convert_netfile(
-        self, in_netfile: str, out_netfile: str = None, target: str = None
+        self,
+        in_netfile: str,
+        out_netfile: str = None,
+        target: str = None,
+        script_handler: NetworkScriptHandler = None,
+        verbose: bool = True,
     ) -> tuple:
         """
         Convert the network definition file to another format, returns the paths to files having both formats in the order of .json, .xml
@@ -1076,6 +1320,8 @@ class TSN_Analyzer:
         out_netfile : Path to dump the output network description file converted from "in_netfile"
         target      : If target is None, then this method convert anyway and return 2 formats
                       If target is given as "xml" or "json", it only convert the file when necessary and return the other unnecessary one as None
+        script_handler : (Optional) Handler doing the conversion. Default is the handler of the analyzer
+        verbose        : (Optional) Print the conversion progress. Default is True
 
         Return:
         ----------
@@ -1084,6 +1330,8 @@ class TSN_Analyzer:
         """
         phy_net_path = out_netfile
         op_net_path = out_netfile
+        if script_handler is None:
+            script_handler = self.script_handler
 
         # In case receiving a physical net
         if in_netfile.endswith("xml"):
@@ -1092,14 +1340,22 @@ class TSN_Analyzer:
                 if target.lower() == "xml":
                     return None, in_netfile
             # Conversion is needed
-            print(
-                f'Receive an XML file "{in_netfile}", converting to a JSON ...', end=""
-            )
+            if verbose:
+                print(
+                    f'Receive an XML file "{in_netfile}", converting to a JSON ...',
+                    end="",
+                )
             if op_net_path is None:
                 op_net_path = os.path.join(self._temp_path, "tempnet.json")
-            self.script_handler.phynet_to_opnet_json(in_netfile, op_net_path)
+            self._convert_once(
+                ("phynet_to_opnet_json",),
+                in_netfile,
+                op_net_path,
+                lambda: script_handler.phynet_to_opnet_json(in_netfile, op_net_path),
+            )
             phy_net_path = in_netfile
-            print("Done")
+            if verbose:
+                print("Done")
 
         # incase receiving a
         elif in_netfile.endswith("json"):
@@ -1109,17 +1365,97 @@ class TSN_Analyzer:
                     return in_netfile, None
 
             # Conversion is needed
-            print(
-                f'Receive a JSON file "{in_netfile}", converting to an XML ...', end=""
-            )
+            if verbose:
+                print(
+                    f'Receive a JSON file "{in_netfile}", converting to an XML ...',
+                    end="",
+                )
             if phy_net_path is None:
                 phy_net_path = os.path.join(self._temp_path, "tempnet.xml")
-            self.script_handler.opnet_json_to_phynet(in_netfile, phy_net_path)
+            self._convert_once(
+                ("opnet_json_to_phynet",),
+                in_netfile,
+                phy_net_path,
+                lambda: script_handler.opnet_json_to_phynet(in_netfile, phy_net_path),
+            )
             op_net_path = in_netfile
-            print("Done")
+            if verbose:
+                print("Done")
 
         return op_net_path, phy_net_path
 
+    def _analyze_all_netfile(self, netfile: str) -> str:
+        """
+        Select the network definition file to analyze with all tools
+        """
+        if netfile is None:
+            if self.netfile is None:
+                raise RuntimeError("No network definition file loaded")
+            netfile = self.netfile
+        return netfile
+
+    def _analyze_all_tasks(
+        self,
+        methods: Union[list, str],
+        use_tfa: bool,
+        use_sfa: bool,
+    ) -> list:
+        """
+        List the analysis of all tools as (method name, keyword arguments, format of the network file to read)
+        """
+        return [
+            (
+                "analyze_panco",
+                dict(methods=methods, use_tfa=use_tfa, use_sfa=use_sfa),
+                "json",
+            ),
+            ("analyze_dnc", dict(methods=methods), "json"),
+            # ("analyze_linear", dict(methods=methods), "json"),
+            ("analyze_xtfa", dict(methods=methods), "xml"),
+        ]
+
+    def _merge_worker_result(self, results: list, muls: dict) -> None:
+        """
+        Load the results obtained by a worker and keep the smallest multipliers
+        """
+        self.results.extend(results)
+        for attr, mul in muls.items():
+            current_mul = getattr(self, attr)
+            if mul is None:
+                continue
+            if (
+                current_mul is None
+                or unit_util.multipliers[mul] < unit_util.multipliers[current_mul]
+            ):
+                setattr(self, attr, mul)
+
+    def _convert_once(
+        self, operation: tuple, in_netfile: str, out_netfile: str, convert
+    ) -> None:
+        """
+        Execute "convert" which writes out_netfile from in_netfile.
+        Skip it when out_netfile is still the output of the same operation on the same input content
+
+        Inputs:
+        ----------
+        operation   : Hashable description of the conversion, e.g. ("phynet_to_opnet_json",)
+        in_netfile  : Path of the source network description file
+        out_netfile : Path of the network description file written by "convert"
+        convert     : Callable without argument executing the conversion
+        """
+        key = (operation, in_netfile, file_digest(in_netfile), out_netfile)
+        out_digest = self._converted_cache.get(key, None)
+        if (
+            out_digest is not None
+            and os.path.exists(out_netfile)
+            and file_digest(out_netfile) == out_digest
+        ):
+            return
+
+        convert()
+        if os.path.exists(out_netfile):
+            self._converted_cache[key] = file_digest(out_netfile)
+
     def _arg_check(
         self, netfile: str, methods: Union[list, str], target_format: str
     ) -> tuple:
@@ -1169,28 +1505,33 @@ class TSN_Analyzer:
 
         return netfile, methods
 
-    def _split_dnc_result(self, dnc_result: str) -> dict:
+    def _split_dnc_result(self, dnc_result: Union[str, Iterable]) -> dict:
         """
-        Split the dnc results from json string to dictionary of
+        Split the dnc results from json lines to dictionary of
         key = method used. e.g. "TFA", "SFA"
         value = list of results by each flow (dict)
+
+        dnc_result can be the whole output string or an iterable of output lines
         """
+        if isinstance(dnc_result, str):
+            dnc_result = dnc_result.splitlines(keepends=False)
+
         result_by_methods = dict()
-        for result_per_flow in dnc_result.splitlines(keepends=False):
-            try:
-                result_json = json.loads(result_per_flow)
-            except Exception as e:
-                print(
-                    "Skip. Cannot obtain DNC result. Could be DNC interface problem or Java problem."
+        loads = json_loads
+        try:
+            for result_per_flow in dnc_result:
+                if len(result_per_flow) == 0:
+                    continue
+                result_json = loads(result_per_flow)
+                result_by_methods.setdefault(result_json.pop("method"), []).append(
+                    result_json
                 )
-                return result_by_methods
-                # raise RuntimeError("Incorrect DNC output, you may need to check the DNC output")
-
-            method = result_json.pop("method")
-            if method not in result_by_methods:
-                result_by_methods[method] = list()
-
-            result_by_methods[method].append(result_json)
+        except ValueError:
+            # Keep the results parsed before the incorrect line
+            print(
+                "Skip. Cannot obtain DNC result. Could be DNC interface problem or Java problem."
+            )
+            # raise RuntimeError("Incorrect DNC output, you may need to check the DNC output")
 
         return result_by_methods
 
@@ -1213,15 +1554,27 @@ class TSN_Analyzer:
         server_delays: dictionary with key=server_name & value=delay
         total_delay: total delay for all servers in the network
         """
-        total_delay = 0
-        server_delay = dict()
-        for nd in xtfa_net.gif.nodes:
-            delay = xtfa_net.gif.nodes[nd]["model"].contentionDelayMax
-            if ignore_dummy and delay <= 0:
-                continue
-            ser_name = nd.rsplit("-", 1)[0] if is_converted else nd
-            server_delay[ser_name] = delay
-            total_delay += delay
+        name_map = self._xtfa_server_name_map(xtfa_net, is_converted)
+        nodes = list(xtfa_net.gif.nodes)
+        node_attrs = xtfa_net.gif.nodes
+        delays = np.fromiter(
+            (node_attrs[nd]["model"].contentionDelayMax for nd in nodes),
+            dtype=np.float64,
+            count=len(nodes),
+        )
+        if ignore_dummy:
+            kept = np.flatnonzero(delays > 0)
+        else:
+            kept = np.arange(len(nodes))
+        kept_delays = delays[kept]
+
+        server_delay = dict(
+            zip(
+                (name_map[nodes[i]] if name_map else nodes[i] for i in kept),
+                kept_delays.tolist(),
+            )
+        )
+        total_delay = float(kept_delays.sum())
 
         return server_delay, total_delay
 
@@ -1246,11 +1599,13 @@ class TSN_Analyzer:
         """
         flow_paths = dict()
         flow_cmu_delays = dict()
+        name_map = self._xtfa_server_name_map(xtfa_net, is_converted)
 
         for flow in xtfa_net.flows:
             flow_name = flow.name
             worst_delay = 0.0
             for last_vertex in flow.getListLeafVertices():
+                ser_names = list()
                 cumulative_delays = list()
                 for nd in nx.shortest_path(flow.graph,source=flow.sources[0],target=last_vertex):
                     cum_delay = flow.graph.nodes[nd]["flow_states"][0].maxDelayFrom[
@@ -1258,18 +1613,31 @@ class TSN_Analyzer:
                     ]
                     if ignore_dummy and cum_delay <= 0:
                         continue
-                    ser_name = nd.rsplit("-", 1)[0] if is_converted else nd
-                    cumulative_delays.append((ser_name, cum_delay))
+                    ser_names.append(name_map[nd] if name_map else nd)
+                    cumulative_delays.append(cum_delay)
 
-                cumulative_delays.sort(key=lambda d: d[1])
-                if cumulative_delays[-1][1] > worst_delay:
-                    flow_paths[flow_name] = [d[0] for d in cumulative_delays]
-                    flow_cmu_delays[flow_name] = [d[1] for d in cumulative_delays]
-                    worst_delay = cumulative_delays[-1][1]
+                # stable sort to keep the path order of servers with equal cumulative delays
+                order = np.argsort(cumulative_delays, kind="stable")
+                if cumulative_delays[order[-1]] > worst_delay:
+                    flow_paths[flow_name] = [ser_names[i] for i in order]
+                    flow_cmu_delays[flow_name] = [cumulative_delays[i] for i in order]
+                    worst_delay = cumulative_delays[order[-1]]
 
         return flow_paths, flow_cmu_delays
 
-    def _build_flow_e2e_table(self, mdFile: mdu, tm_results: dict) -> None:
+    def _xtfa_server_name_map(
+        self, xtfa_net: xtfa_networks.CyclicNetwork, is_converted: bool
+    ) -> dict:
+        """
+        Map xTFA node names back to server names, None if no renaming is needed
+
+        Converted networks name their nodes as "[server name]-[port]", the port suffix is stripped once per node
+        """
+        if not is_converted:
+            return None
+        return {nd: nd.rsplit("-", 1)[0] for nd in xtfa_net.gif.nodes}
+
+    def _build_flow_e2e_table(self, mdFile: MdWriter, tm_results: dict) -> None:
         """
         Build a server result table on mdFile using result_dict, dict key = "tool-method", value is result object
 
@@ -1291,43 +1659,37 @@ class TSN_Analyzer:
             )
         )
 
-        tlm_mapping = dict(zip(tm_results.keys(), range(len(tm_results))))
+        # bind the number formatter once for all table cells
+        fmt = "{:.3f}".format
         flow_mapping = self._create_mapping(tm_results.values(), "flow_delays")
-        table_res = np.empty(
-            (len(flow_mapping) + 1, len(tlm_mapping) + 2), dtype="object"
-        )
-        table_res[:] = ""
-
-        # Column labels
-        table_res[0, :] = ["Flow name", *tlm_mapping.keys(), "Minimum (best)"]
-        # row labels
-        table_res[1:, 0] = list(flow_mapping.keys())
 
-        # minimum: row=flow, col=tool-method
-        min_delay = np.ones((len(flow_mapping), len(tlm_mapping))) * np.inf
-
-        for tlm, res in tm_results.items():
-            for flow_name, flow_delay in res.flow_delays.items():
-                # The number to be written
-                delay_written = flow_delay * unit_util.get_time_unit(
-                    res.time_unit, self._units["flow_delay"]
-                )
-
-                table_res[
-                    flow_mapping[flow_name] + 1, tlm_mapping[tlm] + 1
-                ] = "{:.3f}".format(delay_written)
-                min_delay[flow_mapping[flow_name], tlm_mapping[tlm]] = delay_written
+        # delays of each tool-method in the order of flows, None if not computed
+        delays_per_tlm = list()
+        for res in tm_results.values():
+            scale = unit_util.get_time_unit(res.time_unit, self._units["flow_delay"])
+            flow_delays = res.flow_delays
+            delays_per_tlm.append(
+                [
+                    flow_delays[flow_name] * scale if flow_name in flow_delays else None
+                    for flow_name in flow_mapping
+                ]
+            )
 
-        # Write minimum value
-        table_res[1:, -1] = ["{:.3f}".format(v) for v in np.min(min_delay, axis=1)]
+        # Column labels, then one row per flow ended by the minimum delay among tool-methods
+        table_res = ["Flow name", *tm_results.keys(), "Minimum (best)"]
+        for flow_name, row_delays in zip(flow_mapping, zip(*delays_per_tlm)):
+            table_res.append(flow_name)
+            table_res.extend("" if d is None else fmt(d) for d in row_delays)
+            table_res.append(
+                fmt(min((d for d in row_delays if d is not None), default=np.inf))
+            )
 
         # write into MD
-        table_res = table_res.flatten().tolist()
         mdFile.new_table(
-            rows=len(flow_mapping) + 1, columns=len(tlm_mapping) + 2, text=table_res
+            rows=len(flow_mapping) + 1, columns=len(tm_results) + 2, text=table_res
         )
 
-    def _build_flow_paths(self, mdFile: mdu, tm_results: dict) -> None:
+    def _build_flow_paths(self, mdFile: MdWriter, tm_results: dict) -> None:
         """
         Build a list of flow paths
 
@@ -1349,7 +1711,7 @@ class TSN_Analyzer:
         mdFile.new_list(items=path_to_print)
 
     def _build_server_result_table(
-        self, mdFile: mdu, tm_results: dict, target: str
+        self, mdFile: MdWriter, tm_results: dict, target: str
     ) -> None:
         """
         Build a server result table on mdFile using result_dict
@@ -1360,29 +1722,29 @@ class TSN_Analyzer:
         tm_results: a dictionary with key="tool-method", value=corresponding result
         target: delay or backlog to print different attributes
         """
-        if target.lower() == "delay":
-            title_name = "delay"
-            attr_name = "server_delays"
-            summary_label = "Total"
-            summary_attr = "total_delay"
-            multiplier = self.serv_delay_mul
-            unit = "second"
-        if target.lower() == "backlog":
-            title_name = "backlog"
-            attr_name = "server_backlogs"
-            summary_label = "Max"
-            summary_attr = "max_backlog"
-            multiplier = self.backlog_mul
-            unit = "bit"
+        try:
+            (
+                title_name,
+                attr_name,
+                summary_label,
+                summary_attr,
+                multiplier_attr,
+                unit,
+            ) = server_result_targets[target.lower()]
+        except KeyError as e:
+            raise ValueError(
+                f'Unknown server result target "{target}", must be in {list(server_result_targets)}'
+            ) from e
+        multiplier = getattr(self, multiplier_attr)
 
-        # Skip if no results need to be printed
-        if all([getattr(res, attr_name) is None for res in tm_results.values()]):
-            return
         non_empty_results = {
             key: res
             for key, res in tm_results.items()
             if getattr(res, attr_name) is not None
         }
+        # Skip if no results need to be printed
+        if len(non_empty_results) == 0:
+            return
 
         mdFile.new_header(level=2, title=f"Per server {title_name} bound")
         mul, unit = unit_util.split_multiplier_unit(self._units["server_delay"])
@@ -1392,61 +1754,45 @@ class TSN_Analyzer:
             )
         )
 
-        # Table with mapping assigned
+        # bind the number formatter once for all table cells
+        fmt = "{:.3f}".format
         server_mapping = self._create_mapping(
             non_empty_results.values(), ["graph", "nodes"]
         )
-        tlm_mapping = dict(zip(non_empty_results.keys(), range(len(non_empty_results))))
-        table_res = np.empty(
-            (len(server_mapping) + 2, len(tlm_mapping) + 2), dtype="object"
-        )
-        table_res[:] = ""
-
-        # column/row labels
-        table_res[0, :] = ["server name", *tlm_mapping.keys(), "Minimum (best)"]
-        table_res[1:-1, 0] = list(server_mapping.keys())
-        table_res[-1, 0] = summary_label
-
-        # Minimum value
-        min_val = np.ones((len(server_mapping), len(tlm_mapping))) * np.inf
-
-        for tlm, res in non_empty_results.items():
-            # When nothing is written in the result class
-            if getattr(res, attr_name) is None:
-                continue
-
-            for server_name, attr_num in getattr(res, attr_name).items():
-                val = attr_num * unit_util.get_time_unit(
-                    res.time_unit, self._units["server_delay"]
-                )
-                table_res[
-                    server_mapping[server_name] + 1, tlm_mapping[tlm] + 1
-                ] = "{:.3f}".format(val)
-                min_val[server_mapping[server_name], tlm_mapping[tlm]] = val
 
+        # values of each tool-method in the order of servers, None if not computed
+        values_per_tlm = list()
+        summary_row = list()
+        for res in non_empty_results.values():
+            scale = unit_util.get_time_unit(res.time_unit, self._units["server_delay"])
+            # one dictionary lookup per cell
+            res_values = map(getattr(res, attr_name).get, server_mapping)
+            values_per_tlm.append(
+                [None if v is None else v * scale for v in res_values]
+            )
             summary = getattr(res, summary_attr)
-            if summary is None:
-                continue
-            else:
-                table_res[-1, tlm_mapping[tlm] + 1] = "{:.3f}".format(
-                    summary
-                    * unit_util.get_time_unit(
-                        res.time_unit, self._units["server_delay"]
-                    )
-                )
-
-        # Write minimum value
-        min_val = np.min(min_val, axis=1)
-        table_res[1:-1, -1] = ["{:.3f}".format(v) for v in min_val]
-        table_res[-1, -1] = "{:.3f}".format(np.sum(min_val))
+            summary_row.append("" if summary is None else fmt(summary * scale))
+
+        # Column labels, then one row per server ended by the minimum value among tool-methods
+        table_res = ["server name", *non_empty_results.keys(), "Minimum (best)"]
+        min_val = list()
+        for server_name, row_values in zip(server_mapping, zip(*values_per_tlm)):
+            min_val.append(
+                min((v for v in row_values if v is not None), default=np.inf)
+            )
+            table_res.append(server_name)
+            table_res.extend("" if v is None else fmt(v) for v in row_values)
+            table_res.append(fmt(min_val[-1]))
+        table_res.extend([summary_label, *summary_row, fmt(np.sum(min_val))])
 
         # write into MD
-        table_res = table_res.flatten().tolist()
         mdFile.new_table(
-            rows=len(server_mapping) + 2, columns=len(tlm_mapping) + 2, text=table_res
+            rows=len(server_mapping) + 2,
+            columns=len(non_empty_results) + 2,
+            text=table_res,
         )
 
-    def _build_exec_time_table(self, mdFile: mdu, tm_results: dict) -> None:
+    def _build_exec_time_table(self, mdFile: MdWriter, tm_results: dict) -> None:
         """
         Build a table of execution time of each tool/method pair
 
@@ -1461,32 +1807,26 @@ class TSN_Analyzer:
             f"Unit in {unit_util.multiplier_names[self.exec_time_mul]}second"
         )
 
-        # Table as a numpy array with initial value ""
-        tlm_mapping = dict(zip(tm_results.keys(), range(len(tm_results))))
-        table_exec_time = np.empty((len(tlm_mapping) + 1, 2), dtype="object")
-        table_exec_time[:] = ""
-
-        # Column labels
-        table_exec_time[0, :] = ["tool-method", "Execution Time"]
-        # row labels
-        table_exec_time[1:, 0] = list(tlm_mapping.keys())
+        # bind the number formatter once for all table cells
+        fmt = "{:.3f}".format
+        exec_time_mul = unit_util.multipliers[self.exec_time_mul]
 
-        # Write table execution time content
+        # Column labels, then one row per tool-method
+        table_exec_time = ["tool-method", "Execution Time"]
         for tlm, res in tm_results.items():
-            if res.exec_time is not None:
-                table_exec_time[tlm_mapping[tlm] + 1, 1] = "{:.3f}".format(
-                    res.exec_time / unit_util.multipliers[self.exec_time_mul]
-                )
+            table_exec_time.append(tlm)
+            table_exec_time.append(
+                "" if res.exec_time is None else fmt(res.exec_time / exec_time_mul)
+            )
 
         # write into MD
-        table_exec_time = table_exec_time.flatten().tolist()
         mdFile.new_table(
-            rows=len(tlm_mapping) + 1,
+            rows=len(tm_results) + 1,
             columns=2,
             text=table_exec_time,
         )
 
-    def _build_utility_map(self, mdFile: mdu, tm_results: dict) -> None:
+    def _build_utility_map(self, mdFile: MdWriter, tm_results: dict) -> None:
         """
         Build a table of utility map, load of each server i is computed as (sum of arrival rates at server i) / (service rate at server i)
 
@@ -1529,6 +1869,16 @@ class TSN_Analyzer:
         >>> self._create_mapping(x, "attr")
         {1:0, 2:1}
         """
+        # Results are not modified while writing a report, reuse the mapping of the same elements
+        x = list(x)
+        cache_key = (
+            tuple(map(id, x)),
+            attr_name if type(attr_name) is str else tuple(attr_name),
+            start,
+        )
+        if cache_key in self._mapping_cache:
+            return self._mapping_cache[cache_key]
+
         y = dict()
         index = start
         for elem in x:
@@ -1550,6 +1900,8 @@ class TSN_Analyzer:
                     if k not in y:
                         y[k] = index
                         index += 1
+
+        self._mapping_cache[cache_key] = y
         return y
 
     def _get_smallest_unit(self, results: list = None) -> dict:
@@ -1,16 +1,96 @@
 #!/usr/bin/env python3
-from subprocess import check_output
-from os.path import join
+from subprocess import Popen, PIPE, CalledProcessError
+from os.path import join, exists
+from os import replace, makedirs, remove, stat
+from hashlib import sha1
+from functools import lru_cache
+from collections.abc import Iterator
 
-def dnc_exe(ifpath:str, dnc_jar_path:str="./", tools:list=["TFA"])->str:
+def dnc_exe(ifpath:str, dnc_jar_path:str="./", tools:list=["TFA"], cache_dir:str=None, invalidate:bool=False, jvm_options:tuple=())->Iterator[str]:
     '''
-    Execute dnc via .jar and input arguments
+    Execute dnc via .jar and input arguments, yield the output line by line while DNC is running
+
+    Raise CalledProcessError once the output is consumed if DNC exits with a non-zero code
 
     param:
     ---------
     ifpath: the path to the network definition file
+    dnc_jar_path: the directory containing "dnc_analysis.jar"
+    tools: the DNC methods to execute
+    cache_dir: the directory to store the DNC outputs, the same network file with the same tools and the same jar is not executed again. No cache if None
+               A cached output is replayed as it is, including the execution times measured by DNC when it was produced
+    invalidate: execute DNC and overwrite the cached output even if it exists
+    jvm_options: options given to the JVM, none by default. "-XX:TieredStopAtLevel=1" only uses the quick JIT compiler,
+                 it shortens the start-up of small analyses but slows down long ones such as PMOO or LUDB on large networks
     '''
+    jar_path = join(dnc_jar_path, "dnc_analysis.jar")
+    cache_file = None
+    if cache_dir is not None:
+        # The output only depends on the network content, the tools and the DNC jar
+        with open(ifpath, "rb") as f:
+            key = sha1(f.read()).hexdigest() + "-" + _jar_digest(jar_path) + "-" + ",".join(sorted(tools))
+        cache_file = join(cache_dir, key + ".out")
+        if not invalidate and exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\r\n")
+            return
+        makedirs(cache_dir, exist_ok=True)
 
     args = ["-i", ifpath, "-t", ",".join(tools)]
-    return check_output("java -jar " + join(dnc_jar_path, "dnc_analysis.jar") + ' ' + ' '.join(args), shell=True).decode("utf-8")
+    lines = _dnc_process_lines(jar_path, args, jvm_options)
+
+    # write to a temporary file first so that a partially written output is never read as cache
+    cache = open(cache_file + ".tmp", "w", encoding="utf-8") if cache_file is not None else None
+    completed = False
+    try:
+        for line in lines:
+            if cache is not None:
+                cache.write(line + "\n")
+            yield line
+        completed = True
+    finally:
+        lines.close()
+        if cache is not None:
+            cache.close()
+            if completed:
+                replace(cache_file + ".tmp", cache_file)
+            else:
+                remove(cache_file + ".tmp")
+
+
+def _jar_digest(jar_path:str)->str:
+    '''
+    Digest of the content of the DNC jar, a rebuilt or replaced jar gives another digest
+    '''
+    jar_stat = stat(jar_path)
+    return _file_digest(jar_path, jar_stat.st_mtime_ns, jar_stat.st_size)
+
 
+@lru_cache(maxsize=8)
+def _file_digest(fpath:str, mtime_ns:int, size:int)->str:
+    '''
+    Hash a file once per modification, the modification time and size are only part of the cache key
+    '''
+    with open(fpath, "rb") as f:
+        return sha1(f.read()).hexdigest()
+
+
+def _dnc_process_lines(jar_path:str, args:list, jvm_options:tuple)->Iterator[str]:
+    '''
+    Execute DNC in a new JVM process and yield its output lines
+    '''
+    # Launch java directly without a shell, paths with spaces are passed as they are
+    cmd = ["java", *jvm_options, "-jar", jar_path, *args]
+    proc = Popen(cmd, stdout=PIPE, encoding="utf-8")
+    try:
+        for line in proc.stdout:
+            yield line.rstrip("\r\n")
+        if proc.wait() != 0:
+            raise CalledProcessError(proc.returncode, cmd)
+    finally:
+        # Stop DNC if the output is not entirely consumed
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
@@ -0,0 +1,131 @@
+import re
+
+
+class MdWriter:
+    """
+    Minimal Markdown writer for the analysis reports, all the content is kept in a list of strings
+    and joined once when the file is created. The methods follow the subset of the mdutils interface used by the reports
+
+    Attributes:
+    --------------
+    file_name : Path of the Markdown file to create
+    title     : Title of the document written at the beginning of the file
+    """
+
+    file_name: str  # Path of the Markdown file to create
+    title: str  # Title of the document written at the beginning of the file
+
+    def __init__(self, file_name: str, title: str = "") -> None:
+        """
+        Inputs:
+        -----------
+        file_name: [str] path of the Markdown file, ".md" is appended if missing
+        title: (Optional) [str] title of the document. Default is ""
+        """
+        self.file_name = file_name if file_name.endswith(".md") else f"{file_name}.md"
+        self.title = title
+        self._buffer = list()
+        # (level, title) of each header for the table of contents
+        self._headers = list()
+        self._references = dict()  # reference tag -> path
+        self._table_of_contents = ""
+
+    def new_header(self, level: int, title: str) -> None:
+        """Add a header as "## title", it is listed in the table of contents"""
+        self._headers.append((level, title))
+        self._buffer.append(f"\n{'#' * level} {title}\n")
+
+    def new_paragraph(self, text: str = "") -> None:
+        """Add a text separated by an empty line"""
+        self._buffer.append("\n\n" + text)
+
+    def new_line(self, text: str = "") -> None:
+        """Add a text in a new line"""
+        self._buffer.append("\n" + text)
+
+    def write(self, text: str = "") -> None:
+        """Add a text right after the current content"""
+        self._buffer.append(text)
+
+    def new_list(self, items: list) -> None:
+        """Add an unordered list, each item is marked with "-" unless it already starts with a list marker"""
+        lines = [item if self._is_list_item(item) else f"- {item}" for item in items]
+        self._buffer.append("\n" + "".join(f"{line}\n" for line in lines))
+
+    def new_table(self, columns: int, rows: int, text: list) -> None:
+        """
+        Add a table with centered cells
+
+        Inputs:
+        -----------
+        columns: [int] number of columns
+        rows: [int] number of rows including the column labels
+        text: [list] the cells row after row, there must be columns*rows of them
+        """
+        if columns * rows != len(text):
+            raise ValueError("columns * rows is not equal to text length")
+
+        cells = [str(t).replace("|", r"\|") for t in text]
+        lines = ["|" + "|".join(cells[0:columns]) + "|", "|" + " :---: |" * columns]
+        for start in range(columns, len(cells), columns):
+            lines.append("|" + "|".join(cells[start : start + columns]) + "|")
+        self._buffer.append("\n" + "".join(f"{line}\n" for line in lines))
+
+    def new_reference_image(
+        self, text: str, path: str, reference_tag: str = None
+    ) -> str:
+        """
+        Register an image path to be listed at the end of the file, returns the reference "![text][tag]" to write
+        """
+        if reference_tag is None:
+            reference_tag = text
+        self._references.setdefault(reference_tag, path)
+        return f"![{text}][{reference_tag}]"
+
+    def new_table_of_contents(
+        self, table_title: str = "Table of contents", depth: int = 1
+    ) -> None:
+        """Create a table of contents of the headers written so far, it is placed after the title"""
+        entries = [
+            "\n"
+            + "\t" * (level - 1)
+            + f"* [{title}](#{re.sub('[^a-z0-9_-]', '', title.lower().replace(' ', '-'))})"
+            for level, title in self._headers
+            if level <= depth
+        ]
+        self._table_of_contents = (
+            f"\n{table_title}\n{'=' * len(table_title)}\n" + "".join(entries) + "\n"
+        )
+
+    def get_md_text(self) -> str:
+        """Return the whole Markdown document as a string"""
+        references = ""
+        if len(self._references) > 0:
+            references = "\n\n\n" + "".join(
+                f"[{tag}]: {self._references[tag]}\n"
+                for tag in sorted(self._references)
+            )
+        return "".join(
+            [
+                f"\n{self.title}\n{'=' * len(self.title)}\n",
+                self._table_of_contents,
+                *self._buffer,
+                references,
+            ]
+        )
+
+    def create_md_file(self) -> None:
+        """Write the whole document into the file at once"""
+        with open(self.file_name, "w", encoding="utf-8") as f:
+            f.write(self.get_md_text())
+
+    @staticmethod
+    def _is_list_item(item: str) -> bool:
+        """Whether a list item already starts with a list marker"""
+        return (
+            item.startswith("-")
+            or item.startswith("*")
+            and not item.startswith("**")
+            or item.startswith("+")
+            or re.search(r"^(\d\.)", item) is not None
+        )
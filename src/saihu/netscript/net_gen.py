@@ -3,14 +3,33 @@
 import json
 import numpy as np
 import random
-from copy import deepcopy
+import sys
 from unit_util import *
 
+# orjson is optional, it serializes large generated networks much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dump_network(network:dict, save_dir:str) -> None:
+    '''
+    Dump a generated network into a JSON file, indented by 2 spaces with or without orjson
+    '''
+    if orjson is not None:
+        with open(save_dir, "wb") as ofile:
+            ofile.write(orjson.dumps(network, option=orjson.OPT_INDENT_2|orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        # stream the small chunks of json through a large buffer instead of building the whole text in memory
+        with open(save_dir, "w", buffering=1<<20) as ofile:
+            json.dump(network, ofile, indent=2)
+
 ####################################
 # Generate certain type of network #
 ####################################
 
-def generate_interleave_tandem(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None) -> dict:
+def generate_interleave_tandem(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None, verbose:bool=True) -> dict:
     '''
     Generate an interleave tandem with all arrival/service curves being identical.
     An interleave tandem network is a chain topology,
@@ -34,49 +53,51 @@ def generate_interleave_tandem(size:int, burst:float, arrival_rate:float, max_pa
     capacity     : server output capacity, unit in bps
     
     save_dir: directory to dump the generated json file. If it's None, no file will be dumped.
+    verbose : print the generation progress. Default is True
 
     Returns:
     --------------
     network: [dict] The network written as an output port network
     '''
-    print(f"Generating a interleave tandem network of {size} servers...", end='')
-
-    ## Define servers
+    if verbose:
+        print(f"Generating a interleave tandem network of {size} servers...", end='')
+
+    ## Define servers and flows in one pass
+    # the names are interned as they are compared when the network is parsed
+    server_names = [sys.intern(f"s{server_idx}") for server_idx in range(size)]
+    # All servers share the same service curve object, all flows share the same arrival curve object
+    service_curve = {
+        "latencies": [latency],
+        "rates": [service_rate]
+    }
+    arrival_curve = {
+        "bursts": [burst],
+        "rates": [arrival_rate]
+    }
     servers = [None]*size
-    for server_idx in range(size):
-        servers[server_idx] = {
-            "name": f"s{server_idx}",
-            "service_curve": {
-                "latencies": [latency],
-                "rates": [service_rate]
-            },
-            "capacity": capacity
-        }
-
-    ## Define flows
     flows = [None]*size
     # 1. The flow to go through the entire network (chain)
-    through_flow = {
+    flows[0] = {
         "name": "f0",
-        "path": [servers[idx]["name"] for idx in np.arange(size)],
-        "arrival_curve": {
-            "bursts": [burst],
-            "rates": [arrival_rate]
-        },
+        "path": list(server_names),
+        "arrival_curve": arrival_curve,
         "max_packet_length": max_packet_length
     }
-    flows[0] = through_flow
-    # 2. The flows to "interleave" the servers. Flows through every adjacent pair of servers.
-    for flow_idx in range(1, size):
-        flows[flow_idx] = {
-            "name": f"f{flow_idx}",
-            "path": [servers[flow_idx-1]["name"], servers[flow_idx]["name"]],
-            "arrival_curve": {
-                "bursts": [burst],
-                "rates": [arrival_rate]
-            },
-            "max_packet_length": max_packet_length
+    for server_idx in range(size):
+        server_name = server_names[server_idx]
+        servers[server_idx] = {
+            "name": server_name,
+            "service_curve": service_curve,
+            "capacity": capacity
         }
+        # 2. The flows to "interleave" the servers. Flows through every adjacent pair of servers.
+        if server_idx > 0:
+            flows[server_idx] = {
+                "name": f"f{server_idx}",
+                "path": [server_names[server_idx-1], server_name],
+                "arrival_curve": arrival_curve,
+                "max_packet_length": max_packet_length
+            }
 
 
 
@@ -87,16 +108,16 @@ def generate_interleave_tandem(size:int, burst:float, arrival_rate:float, max_pa
         "servers": servers
     }
     if save_dir is not None:
-        with open(save_dir, "w") as ofile:
-            json.dump(network, ofile, indent=4)
+        _dump_network(network, save_dir)
 
-    print("Done")
+    if verbose:
+        print("Done")
 
     return network
 
 
 
-def generate_ring(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None) -> dict:
+def generate_ring(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None, verbose:bool=True) -> dict:
     '''
     Generate a ring with all arrival/service curves being identical.
     An interleave tandem network is a chain topology,
@@ -124,36 +145,45 @@ def generate_ring(size:int, burst:float, arrival_rate:float, max_packet_length:f
     capacity: server capacity
     
     save_dir: directory to dump the generated json file. If it's None, no file will be dumped.
+    verbose : print the generation progress. Default is True
     '''
-    print(f"Generating a ring network of {size} servers...", end='')
+    if verbose:
+        print(f"Generating a ring network of {size} servers...", end='')
 
     ## Define servers
+    # the names are interned as they are compared when the network is parsed
+    server_names = [sys.intern(f"s{server_idx}") for server_idx in range(size)]
+    # All servers share the same service curve object
+    service_curve = {
+        "latencies": [latency],
+        "rates": [service_rate]
+    }
     servers = [None]*size
     for server_idx in range(size):
         servers[server_idx] = {
-            "name": f"s{server_idx}",
-            "service_curve": {
-                "latencies": [latency],
-                "rates": [service_rate]
-            },
+            "name": server_names[server_idx],
+            "service_curve": service_curve,
             "capacity": capacity
         }
 
     ## Define flows
-    flows = [None]*size
+    # All flows share the same arrival curve object
+    arrival_curve = {
+        "bursts": [burst],
+        "rates": [arrival_rate]
+    }
     # 1. The flows to go through all servers by each starting server
-    for flow_idx in range(size):
-        path = np.roll(np.arange(size), -flow_idx)
-        path = [servers[idx]["name"] for idx in path]
-        flows[flow_idx] = {
+    # row i of the circulant index matrix is the ring starting from server i
+    paths = ((np.arange(size)[None, :] + np.arange(size)[:, None]) % size).tolist()
+    flows = [
+        {
             "name": f"f{flow_idx}",
-            "path": path,
-            "arrival_curve": {
-                "bursts": [burst],
-                "rates": [arrival_rate]
-            },
+            "path": [server_names[idx] for idx in path],
+            "arrival_curve": arrival_curve,
             "max_packet_length": max_packet_length
         }
+        for flow_idx, path in enumerate(paths)
+    ]
 
 
     ## Dump network definition
@@ -163,16 +193,16 @@ def generate_ring(size:int, burst:float, arrival_rate:float, max_packet_length:f
         "servers": servers
     }
     if save_dir is not None:
-        with open(save_dir, "w") as ofile:
-            json.dump(network, ofile, indent=4)
+        _dump_network(network, save_dir)
 
-    print("Done")
+    if verbose:
+        print("Done")
 
     return network
 
 
 
-def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None) -> dict:
+def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:float, latency:float, service_rate:float, capacity:float, save_dir:str=None, verbose:bool=True) -> dict:
     '''
     Generate a mesh network, which has the topology
     ------   ------      --------
@@ -197,13 +227,18 @@ def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:f
     latency : service latency
     service_rate: service rate
     capacity: server capacity
+
+    save_dir: directory to dump the generated json file. If it's None, no file will be dumped.
+    verbose : print the generation progress. Default is True
     '''
-    print(f"Generating a mesh network of {size} servers...", end='')
+    if verbose:
+        print(f"Generating a mesh network of {size} servers...", end='')
 
     ## Check if available construction
     if size%2 == 0:
         size += 1
-        print("Mesh network must have odd number of servers, add 1 new server...", end='')
+        if verbose:
+            print("Mesh network must have odd number of servers, add 1 new server...", end='')
 
     mesh_level = size//2 # the number of level of interwinding mesh
     ## Create the adjacency matrix
@@ -230,18 +265,22 @@ def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:f
     #     adjacency_matrix = [[0]]
 
     ## Define servers
+    # the names are interned as they are compared when the network is parsed
+    server_names = [sys.intern(f"s_{server_idx}") for server_idx in range(size)]
+    # All servers but the last one share the same service curve object
+    service_curve = {
+        "latencies": [latency],
+        "rates": [service_rate]
+    }
     servers = [None]*size
     for server_idx in range(size-1):
         servers[server_idx] = {
-            "name": f"s_{server_idx}",
-            "service_curve": {
-                "latencies": [latency],
-                "rates": [service_rate]
-            },
+            "name": server_names[server_idx],
+            "service_curve": service_curve,
             "capacity": capacity
         }
     servers[-1] = {
-        "name": f"s_{size-1}",
+        "name": server_names[-1],
         "service_curve": {
             "latencies": [latency],
             "rates": [2*service_rate]
@@ -251,23 +290,26 @@ def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:f
 
 
     ## Define flows
-    flows = [None]*(2**mesh_level)
+    # All flows share the same arrival curve object
+    arrival_curve = {
+        "bursts": [burst],
+        "rates": [arrival_rate]
+    }
     base_index = np.arange(mesh_level, dtype=int)*2
     # use binary representation of length "mesh_level" of a integer, each bit is 0 if select upper server; 1 if lower
-    for flow_idx in range(2**mesh_level):
-        bin_id = '{0:0{width}b}'.format(flow_idx, width=mesh_level)
-        selection = np.array([int(b) for b in bin_id], dtype=int)
-        path = (selection + base_index).tolist() + [size-1]
-        path = [servers[idx]["name"] for idx in path]
-        flows[flow_idx] = {
+    # the bits of all flow indices are extracted at once, most significant bit first
+    flow_ids = np.arange(2**mesh_level, dtype=np.int64)
+    selections = (flow_ids[:, None] >> np.arange(mesh_level-1, -1, -1)[None, :]) & 1
+    paths = np.concatenate([selections + base_index[None, :], np.full((2**mesh_level, 1), size-1)], axis=1).tolist()
+    flows = [
+        {
             "name": f"fl_{flow_idx}",
-            "path": path,
-            "arrival_curve": {
-                "bursts": [burst],
-                "rates": [arrival_rate]
-            },
+            "path": [server_names[idx] for idx in path],
+            "arrival_curve": arrival_curve,
             "max_packet_length": max_packet_length
         }
+        for flow_idx, path in enumerate(paths)
+    ]
 
 
     ## Dump network definition
@@ -277,10 +319,10 @@ def generate_mesh(size:int, burst:float, arrival_rate:float, max_packet_length:f
         "servers": servers
     }
     if save_dir is not None:
-        with open(save_dir, "w") as ofile:
-            json.dump(network, ofile, indent=4)
+        _dump_network(network, save_dir)
 
-    print("Done")
+    if verbose:
+        print("Done")
 
     return network
 
@@ -292,18 +334,35 @@ def node_name(id):
     return f"S{id}"
 
 def port_name(sname, pid):
-    return f"{sname}-o{pid}"
+    return sys.intern(f"{sname}-o{pid}")
 
 def get_uniform(minval, maxval=None, force_type=float) -> str:
     if maxval is None:
         return minval
-    
+
+    return _sample_uniform(*_parse_uniform_bounds(minval, maxval), force_type)
+
+def uniform_sampler(value, force_type=float, rng=random):
+    '''
+    Returns a function drawing a value as "get_uniform(*value)" if value is a tuple, otherwise the function always returns value.
+    The bounds are parsed once here instead of at every draw, the values are drawn from "rng", a `random.Random` or the `random` module
+    '''
+    if type(value) is not tuple:
+        return lambda: value
+    if len(value) < 2 or value[1] is None:
+        return lambda: value[0]
+
+    min_num, max_num, unit = _parse_uniform_bounds(*value)
+    return lambda: _sample_uniform(min_num, max_num, unit, force_type, rng)
+
+def _parse_uniform_bounds(minval, maxval) -> tuple:
+    '''
+    Parse the bounds of a uniform range, returns (min number, max number, base unit)
+    '''
     if not is_comparable(minval, maxval):
         raise ValueError(f"The values \'{minval}\' and \'{maxval}\' are not in the same unit")
     min_num = parse_num_unit(minval)
     max_num = parse_num_unit(maxval)
-    val = force_type(random.uniform(min_num, max_num))
-    val, mul = decide_multiplier(val)
 
     unit = ''
     if is_time_unit(minval) or is_time_unit(maxval):
@@ -313,6 +372,11 @@ def get_uniform(minval, maxval=None, force_type=float) -> str:
     if is_rate_unit(minval) or is_rate_unit(maxval):
         unit = 'bps'
 
+    return min_num, max_num, unit
+
+def _sample_uniform(min_num:float, max_num:float, unit:str, force_type=float, rng=random) -> str:
+    val = force_type(rng.uniform(min_num, max_num))
+    val, mul = decide_multiplier(val)
     return f"{val}{mul}{unit}"
 
 
@@ -326,7 +390,8 @@ def generate_fix_topology_network(num_flows:int,
                                   flow_attrib:dict=dict(),
                                   save_dir:str=None,
                                   link_prob:float=0.9,
-                                  rand_seed:int=None) -> dict:
+                                  rand_seed:int=None,
+                                  verbose:bool=True) -> dict:
     '''
     Generate a network with a given switch topology
 
@@ -363,12 +428,13 @@ def generate_fix_topology_network(num_flows:int,
         1. `float`: a direct assignment. e.g. 2.0
         2. `str`: a constant assignment with unit. e.g. "1Gbps"
     - max_out_end_stations `int` : maximum number of end stations (sink) that can be attached to a switch. Default is 1
-    - network_attrib `dict` : (optional) Additinoal network information. Default is empty
+    - network_attrib `dict` : (optional) Additinoal network information, copied shallowly into the network. Default is empty
     - server_attrib `dict`  : (optional) Additinoal server information. Default is empty
     - flow_attrib `dict`    : (optional) Additinoal flow information. Default is empty
     - save_dir `str` : (optional) path to dump the generated file as a json output-port network. Default is None, where no file will be dumped
     - link_prob `float` : (optional) probability p to continue finding next switch, otherwise directly go to a sink. Default is 0.9
-    - rand_seed `int` : (optional) random seed to feed to python `random` library. Default is None (random seed by time)
+    - rand_seed `int` : (optional) random seed of the python `random.Random` generator used for this network, the global `random` state is left untouched. Default is None (random seed by time)
+    - verbose `bool` : (optional) print the generation progress. Default is True
 
     Output
     ----------
@@ -396,11 +462,12 @@ def generate_fix_topology_network(num_flows:int,
     assert 0 <= link_prob <= 1
     assert max_out_end_stations >= 1
 
-    random.seed(rand_seed)
+    rng = random.Random(rand_seed)
 
     NUM_SWITCHES = len(connections)
 
-    print(f"Generating random fixed-topology network of {num_flows} flows and {NUM_SWITCHES} switches...", end='')
+    if verbose:
+        print(f"Generating random fixed-topology network of {num_flows} flows and {NUM_SWITCHES} switches...", end='')
 
     #####################
     # Random Generation #
@@ -410,7 +477,7 @@ def generate_fix_topology_network(num_flows:int,
     next_input_port  = dict(zip(connections.keys(), [1]*NUM_SWITCHES))
     next_input_port.update(zip([f"sk{i}" for i in range(1, max_out_end_stations+1)], [1]*max_out_end_stations))
 
-    network = deepcopy(network_attrib)
+    network = dict(network_attrib)
     # default name priority 1: file name
     if save_dir is not None:
         network.setdefault("name", save_dir.rsplit('.', 1)[0])
@@ -419,59 +486,70 @@ def generate_fix_topology_network(num_flows:int,
     network.setdefault("multiplexing", "FIFO")
 
     # used_connection : labels the used connection
-    # key=(from_switch_id, to_switch_id) ; value=(from_output_port_id, to_input_port_id)
+    # key=(from_switch_id, to_switch_id) ; value=(from_output_port_name, to_input_port_id)
     # to_switch_id is negative if it's a sink
     used_connection = dict()
+    sink_names = [f"sk{i}" for i in range(1, max_out_end_stations+1)]
+
+    flows = [None]*num_flows
+    # output port name -> server, in the order of creation
+    servers = dict()
 
-    flows   = list()
-    servers = list()
+    # the units of the random ranges are parsed once for all the draws
+    sample_latency      = uniform_sampler(latency, rng=rng)
+    sample_service_rate = uniform_sampler(service_rate, rng=rng)
+    sample_burst        = uniform_sampler(burst, force_type=int, rng=rng)
+    sample_arrival_rate = uniform_sampler(arrival_rate, rng=rng)
+    switch_names = list(connections.keys())
 
-    server_names = list()
+    # the switches reachable from each switch, built once for all the random walks
+    connection_sets = {switch: frozenset(neighbors) for switch, neighbors in connections.items()}
 
     # random paths
     for fid in range(num_flows):
         path = list()
         # randomly decides a starting source
-        src_node = random.choice(list(connections.keys()))
+        src_node = rng.choice(switch_names)
 
         visited_switches = set()
 
         while True:                    
             # Generate next node
             # Check if still has unvisited switch
-            if set(connections[src_node]).issubset(visited_switches):
+            unvisited_switches = connection_sets[src_node] - visited_switches
+            if not unvisited_switches:
                 break
 
-            if random.random() < link_prob:  # connect to next switch
+            if rng.random() < link_prob:  # connect to next switch
                 # get a switch name from unvisited switches
-                next_node = random.choice(list(set(connections[src_node])-visited_switches))
+                next_node = rng.choice(tuple(unvisited_switches))
 
             else:   # going directly to sink
-                next_node = "sk{}".format(random.randint(1, max_out_end_stations))
+                next_node = sink_names[rng.randint(1, max_out_end_stations)-1]
 
             visited_switches.add(src_node)
 
-            if (src_node, next_node) not in used_connection:
-                used_connection[(src_node, next_node)] = (next_output_port[src_node], next_input_port[next_node])
+            # the port names are formatted once per connection
+            connection = (src_node, next_node)
+            if connection not in used_connection:
+                used_connection[connection] = (port_name(src_node, next_output_port[src_node]), next_input_port[next_node])
                 next_output_port[src_node] += 1
                 next_input_port[next_node] += 1
 
-            out_port, in_port = used_connection[(src_node, next_node)]
-            out_port_name = port_name(src_node, out_port)
+            out_port_name, in_port = used_connection[connection]
 
             # Add server if it's not defined yet
-            if out_port_name not in server_names:
+            if out_port_name not in servers:
                 # Create a new output port
-                servers.append({
+                servers[out_port_name] = {
                     "name": out_port_name,
                     "service_curve": {
-                        "latencies": [get_uniform(*latency) if type(latency) is tuple else latency],
-                        "rates": [get_uniform(*service_rate) if type(service_rate) is tuple else service_rate]
+                        "latencies": [sample_latency()],
+                        "rates": [sample_service_rate()]
                     },
                     "capacity": capacity,
                     **server_attrib
-                })
-                server_names.append(out_port_name)
+                }
 
             path.append(out_port_name)
             src_node = next_node
@@ -480,28 +558,28 @@ def generate_fix_topology_network(num_flows:int,
                 break
         
 
-        flows.append({
+        flows[fid] = {
             "name": f"f{fid+1}",
             "path": path,
             "arrival_curve": {
-                "bursts": [get_uniform(*burst, force_type=int) if type(burst) is tuple else burst],
-                "rates": [get_uniform(*arrival_rate) if type(arrival_rate) is tuple else arrival_rate]
+                "bursts": [sample_burst()],
+                "rates": [sample_arrival_rate()]
             },
             "max_packet_length": max_packet_length,
             **flow_attrib
-        })
+        }
 
     dump_file = {
         "network": network,
-        "servers": servers,
+        "servers": list(servers.values()),
         "flows": flows
     }
 
     # output dump file
     if save_dir is not None:
-        with open(save_dir, 'w') as ofile:
-            json.dump(dump_file, ofile, indent=4)
+        _dump_network(dump_file, save_dir)
 
-    print("Done")
+    if verbose:
+        print("Done")
 
     return dump_file
\ No newline at end of file
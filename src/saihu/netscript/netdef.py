@@ -1,15 +1,21 @@
 
 import xml.etree.ElementTree
 import warnings
-import copy
+import sys
 import numpy as np
 import json
 from typing import Union
-from copy import deepcopy
+from functools import lru_cache
 
 import networkx as nx
 from netscript.unit_util import *
 
+# orjson is optional, it reads and writes large networks much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 keysInWopanetXML = {
     "network": "network",
     "network_tech": "technology",
@@ -74,6 +80,73 @@ def try_raise(task_str:str, data, func, *fargs, **fkargs):
         raise Exception("Error when trying on {task} with data {d}".format(task=task_str, d=data)) from e
 
 
+def _flatten_mandatory_entries(entries:dict, subfields:tuple=()) -> dict:
+    '''
+    Flatten nested mandatory entries into a dict of key=tuple of subfields to reach a layer ; value=list of (field name, whether it has deeper fields)
+    '''
+    schema = {subfields: [(field, type(ftype) is dict) for field, ftype in entries.items()]}
+    for field, ftype in entries.items():
+        if type(ftype) is dict:
+            schema.update(_flatten_mandatory_entries(ftype, (*subfields, field)))
+    return schema
+
+
+def _split_unit_value(unitstr:str, unit_type:str) -> Union[tuple,None]:
+    '''
+    Split a plain "{multiplier}{unit}" string into the values (multiplier, unit), None if the string is not in this form
+    '''
+    try:
+        if unit_type == "rate":
+            unit_len, unit_value = 3, interpret_rate(unitstr[-3:])
+        elif unit_type == "time":
+            unit_len, unit_value = 1, time_units[unitstr[-1]]
+        else:
+            unit_len, unit_value = 1, data_units[unitstr[-1]]
+    except (KeyError, ValueError, IndexError):
+        return None
+
+    if len(unitstr) == unit_len:
+        return 1, unit_value
+    if len(unitstr) == unit_len+1 and unitstr[0] in multipliers:
+        return multipliers[unitstr[0]], unit_value
+    return None
+
+
+@lru_cache(maxsize=256)
+def _unit_multiplier(written_unit:str, unit_type:str, default_unit:str) -> Union[tuple,None]:
+    '''
+    Resolve the factors to convert a pure number written in "written_unit" into "default_unit"
+
+    A number "num" is converted as num * multiplier * unit / target, the same operations as the parse_num_unit_* functions.
+    Returns (multiplier, unit, target), or None if either unit is not a plain "{multiplier}{unit}" string,
+    then the number should go through the parse_num_unit_* functions which raise the proper error
+    '''
+    if written_unit == '':
+        return 1, 1, 1.0
+
+    orig = _split_unit_value(written_unit, unit_type)
+    trg = _split_unit_value(default_unit, unit_type)
+    if orig is None or trg is None:
+        return None
+    # data multipliers can't be smaller than a bit
+    if unit_type == "data" and (orig[0] < 1 or trg[0] < 1):
+        return None
+
+    return orig[0], orig[1], float(trg[1]*trg[0])
+
+
+@lru_cache(maxsize=1024)
+def _parse_num_unit(numstr:str, unit_type:str, default_unit:str) -> float:
+    '''
+    Parse a number string with unit into "default_unit", the same strings repeat over the flows and servers of a network
+    '''
+    if unit_type == "time":
+        return parse_num_unit_time(numstr, default_unit)
+    if unit_type == "data":
+        return parse_num_unit_data(numstr, default_unit)
+    return parse_num_unit_rate(numstr, default_unit)
+
+
 class PhysicalNet:
     '''
     Defines a physical network 
@@ -89,6 +162,7 @@ class PhysicalNet:
         self.nodes = dict()
         self.flows = dict()
         self.links = dict()
+        self._link_ports = dict()  # key=source ; value=dict of key=destination, value=output port of the first link
 
         if root is not None:
             self.read(root)
@@ -98,36 +172,47 @@ class PhysicalNet:
         '''
         Read from WOPANet format XML file
         '''
-        self.parse_network(root)
-        self.parse_topology(root)
-        self.parse_flows(root)
+        # The top-level elements are grouped by tag in one pass and shared by all parsers
+        elements = self._group_elements(root)
+        self.parse_network(root, elements)
+        self.parse_topology(root, elements)
+        self.parse_flows(root, elements)
 
 
-    def parse_network(self, root:xml.etree.ElementTree)->None:
+    def parse_network(self, root:xml.etree.ElementTree, elements:dict=None)->None:
         '''
         Parse information in the "network" element
+
+        elements: (Optional) the top-level elements of root grouped by tag, they are grouped from root if not given
         '''
-        net_elems = root.findall(keysInWopanetXML["network"])
+        if elements is None:
+            elements = self._group_elements(root)
+        net_elems = elements.get(keysInWopanetXML["network"], [])
         if(len(net_elems) != 1):
             raise xml.etree.ElementTree.ParseError("Too many network items in XML")
-        net_attribs = dict(net_elems[0].attrib)
+        # the attributes are strings, a shallow copy is enough
+        self.network = dict(net_elems[0].attrib)
 
         # Make sure at least has "name" attribute
-        technologies = net_attribs.pop(keysInWopanetXML["network_tech"], "FIFO")
-        self.network = copy.deepcopy(net_attribs)
+        technologies = self.network.pop(keysInWopanetXML["network_tech"], "FIFO")
         self.network["technology"] = technologies.split("+")
-        self.network["name"] = net_attribs.pop(keysInWopanetXML["network_name"], "Network")
+        self.network["name"] = self.network.get(keysInWopanetXML["network_name"], "Network")
 
 
-    def parse_topology(self, root:xml.etree.ElementTree)->None:
+    def parse_topology(self, root:xml.etree.ElementTree, elements:dict=None)->None:
         '''
         Parse information for "station" and "switches"
+
+        elements: (Optional) the top-level elements of root grouped by tag, they are grouped from root if not given
         '''
+        if elements is None:
+            elements = self._group_elements(root)
+
         ## Nodes
-        stations = root.findall(keysInWopanetXML["end_system"])
+        stations = elements.get(keysInWopanetXML["end_system"], [])
         for st in stations:
             try:
-                name = st.attrib.pop(keysInWopanetXML["phy_node_name"])
+                name = sys.intern(st.attrib.pop(keysInWopanetXML["phy_node_name"]))
             except KeyError as e:
                 raise xml.etree.ElementTree.ParseError("A station has no name") from e
 
@@ -141,10 +226,10 @@ class PhysicalNet:
                 **st.attrib
             }
         
-        switches = root.findall(keysInWopanetXML["switch"])
+        switches = elements.get(keysInWopanetXML["switch"], [])
         for st in switches:
             try:
-                name = st.attrib.pop(keysInWopanetXML["phy_node_name"])
+                name = sys.intern(st.attrib.pop(keysInWopanetXML["phy_node_name"]))
             except KeyError as e:
                 raise xml.etree.ElementTree.ParseError("A switch has no name") from e
 
@@ -159,18 +244,24 @@ class PhysicalNet:
             }
         
         ## Links
-        links = root.findall(keysInWopanetXML["link"])
+        links = elements.get(keysInWopanetXML["link"], [])
+        # the links already defined, as (from_node, content of the link) to detect repeated definitions
+        defined_links = set()
+        # the output ports already listed in "used_output_ports", as (from_node, from_port)
+        used_ports = set()
         for lk in links:
             try:
-                from_node = lk.attrib.pop(keysInWopanetXML["link_from"])
-                to_node   = lk.attrib.pop(keysInWopanetXML["link_to"])
+                # node and port names repeat over links and flow paths, interned names are compared by identity
+                from_node = sys.intern(lk.attrib.pop(keysInWopanetXML["link_from"]))
+                to_node   = sys.intern(lk.attrib.pop(keysInWopanetXML["link_to"]))
             except KeyError as e:
                 raise xml.etree.ElementTree.ParseError("Link needs to have \"%s\" and \"%s\".".format(keysInWopanetXML["link_from"], keysInWopanetXML["link_to"])) from e
 
-            from_port = lk.attrib.pop(keysInWopanetXML["link_from_port"], "o0")
-            to_port = lk.attrib.pop(keysInWopanetXML["link_to_port"], "i0")
+            from_port = sys.intern(lk.attrib.pop(keysInWopanetXML["link_from_port"], "o0"))
+            to_port = sys.intern(lk.attrib.pop(keysInWopanetXML["link_to_port"], "i0"))
 
-            if from_port not in self.nodes[from_node]["used_output_ports"]:
+            if (from_node, from_port) not in used_ports:
+                used_ports.add((from_node, from_port))
                 self.nodes[from_node]["used_output_ports"].append(from_port)
 
             link_info = {
@@ -179,30 +270,44 @@ class PhysicalNet:
                 "dest_port": to_port,
                 **lk.attrib
             }
-            if from_node not in self.links:
-                self.links[from_node] = [link_info]
-            else:
-                if link_info in self.links[from_node]:
-                    raise xml.etree.ElementTree.ParseError(f"Link {from_node}->{to_node} using port {from_port} has multiple destination")
-                self.links[from_node].append(link_info)
+            link_key = (from_node, frozenset(link_info.items()))
+            if link_key in defined_links:
+                raise xml.etree.ElementTree.ParseError(f"Link {from_node}->{to_node} using port {from_port} has multiple destination")
+            defined_links.add(link_key)
+            self.links.setdefault(from_node, []).append(link_info)
 
+        # Index the output port of each link for the flow paths, the first link to a destination is used
+        self._link_ports = dict()
+        for src, src_links in self.links.items():
+            ports = self._link_ports[src] = dict()
+            for lk in src_links:
+                ports.setdefault(lk["dest"], lk["output_port"])
 
-    def parse_flows(self, root:xml.etree.ElementTree)->None:
+
+    def parse_flows(self, root:xml.etree.ElementTree, elements:dict=None)->None:
         '''
         Parse information for flows
+
+        elements: (Optional) the top-level elements of root grouped by tag, they are grouped from root if not given
         '''
-        flows = root.findall(keysInWopanetXML["flow"])
+        if elements is None:
+            elements = self._group_elements(root)
+        flows = elements.get(keysInWopanetXML["flow"], [])
         for flow_idx, fl in enumerate(flows):
             fl_name = fl.attrib.pop("name", f"fl{flow_idx}")
+            # skip a repeated flow before walking its paths
+            if fl_name in self.flows:
+                warnings.warn(f"Flow named \"{fl_name}\" is defined multiple times, only the first definition is used.")
+                continue
+
             try:
-                source = fl.attrib.pop("source")
+                source = sys.intern(fl.attrib.pop("source"))
             except KeyError as e:
                 raise xml.etree.ElementTree.ParseError(f"Flow \"{fl_name}\" needs to have a source") from e
 
-            fl_attrib = copy.deepcopy(fl.attrib)
             fl_key = fl_name
-            self.flows[fl_key] = dict()
-            self.flows[fl_key]["attrib"] = dict(**fl_attrib)
+            # the attributes are strings, one shallow copy is enough
+            self.flows[fl_key] = {"attrib": dict(fl.attrib)}
 
             paths = fl.findall(keysInWopanetXML["flow_path"])
             for path_idx, fl_path in enumerate(paths):
@@ -218,7 +323,7 @@ class PhysicalNet:
                     prev_node = source
                     for step in fl_path.findall(keysInWopanetXML["flow_path_step"]):
                         try:
-                            dest = step.attrib.pop(keysInWopanetXML["flow_path_step_name"])
+                            dest = sys.intern(step.attrib.pop(keysInWopanetXML["flow_path_step_name"]))
                         except KeyError as e:
                             raise AttributeError("No attribute \"%s\" in flow %s, path %s".format(keysInWopanetXML["flow_path_step_name"], fl_key, path_name)) from e
 
@@ -234,7 +339,7 @@ class PhysicalNet:
                     prev_node = source
                     for step in fl_path.findall(keysInWopanetXML["flow_path_step"]):
                         try:
-                            dest = step.attrib.pop(keysInWopanetXML["flow_path_step_name"])
+                            dest = sys.intern(step.attrib.pop(keysInWopanetXML["flow_path_step_name"]))
                         except KeyError as e:
                             raise AttributeError("No attribute \"%s\" in flow %s, path %s".format(keysInWopanetXML["flow_path_step_name"], fl_key, path_name)) from e
 
@@ -255,8 +360,9 @@ class PhysicalNet:
             if "service-rate" not in content and ignore_dummy:
                 continue
 
-            node_info = deepcopy(content)
-            output_ports = node_info.pop("used_output_ports")
+            # the values are strings, a shallow copy without the ports is enough
+            node_info = {key: value for key, value in content.items() if key != "used_output_ports"}
+            output_ports = content["used_output_ports"]
             # Special case: when no output port used (no flow passes through node)
             if len(output_ports) == 0:
                 port_list.append({"name": node_name, "physical_node":node_name, "port":None, **node_info})
@@ -264,34 +370,39 @@ class PhysicalNet:
 
             for pid, port in enumerate(output_ports):
                 op_name = f"{node_name}-{port}"
-                # Check if there's link overwrittten parameters
-                if "service-latency" in self.links[node_name][pid]:
-                    node_info["service-latency"] = self.links[node_name][pid]["service-latency"]
-                if "service-rate" in self.links[node_name][pid]:
-                    node_info["service-rate"] = self.links[node_name][pid]["service-rate"]
-                if "transmission-capacity" in self.links[node_name][pid]:
-                    node_info["transmission-capacity"] = self.links[node_name][pid]["transmission-capacity"]
+                # Check if there's link overwrittten parameters, they only apply to this port
+                link = self.links[node_name][pid]
+                overwritten = {key: link[key] for key in ("service-latency", "service-rate", "transmission-capacity") if key in link}
 
-                port_list.append({"name": op_name, "physical_node":node_name, "port":port, **node_info})
+                port_list.append({"name": op_name, "physical_node":node_name, "port":port, **node_info, **overwritten})
 
         return port_list
     
 
 
+    @staticmethod
+    def _group_elements(root:xml.etree.ElementTree)->dict:
+        '''
+        Group the top-level elements of root by tag, returns a dict of key=tag ; value=list of elements in document order
+        '''
+        if isinstance(root, xml.etree.ElementTree.ElementTree):
+            root = root.getroot()
+
+        elements = dict()
+        for elem in root:
+            elements.setdefault(elem.tag, []).append(elem)
+        return elements
+
+
     def __get_link_port(self, src:str, dest:str)->str:
         '''
         Get the output port used from "src" to "dest"
         '''
         try:
-            for lk in self.links[src]:
-                if lk["dest"] == dest:
-                    return lk["output_port"]
-
+            return self._link_ports[src].get(dest)
         except KeyError:
             raise xml.etree.ElementTree.ParseError(f"Unable to resolve port from {src}->{dest}, no links coming out of {src} with destination {dest}")
 
-        return None
-
 
 
 class OutputPortNet:
@@ -336,17 +447,32 @@ class OutputPortNet:
         }
     }
 
+    # The mandatory entries flattened by layer, computed once from "_mandatory_entries"
+    # key=tuple of the subfields to reach a layer ; value=list of (field name, whether it has deeper fields)
+    _mandatory_schema : dict = _flatten_mandatory_entries(_mandatory_entries)
+
     base_unit = {
         "time": "s",
         "data": "b",
         "rate": "bps"
     }
 
+    # Curves with at most this number of points are checked and converted on python lists instead of numpy arrays
+    _small_curve_len : int = 8
+
     def __init__(self, ifile:str=None, network_def:dict=None):
         self.network_info  = dict() # general network information
         self.adjacency_mat = None   # adjacency matrix
         self.servers = list()
         self.flows = list()
+        # servers visited by all flow paths one after another, and the arrival rate of the flow at each of them
+        self._flat_paths = np.zeros(0, dtype=np.intp)
+        self._flat_path_rates = np.zeros(0, dtype=np.float64)
+        # first rate of the arrival curve of each flow
+        self._flow_rates = np.zeros(0, dtype=np.float64)
+        # first rate of the service curve and name of each server
+        self._ser_rates = np.zeros(0, dtype=np.float64)
+        self._ser_names = list()
 
         if network_def is not None:
             self.parse(network_def)
@@ -372,8 +498,12 @@ class OutputPortNet:
         Read from a input file in json format
         '''
         ## Read from file
-        with open(ifpath, 'r') as ifile:
-            network_def = json.load(ifile)
+        if orjson is not None:
+            with open(ifpath, 'rb') as ifile:
+                network_def = orjson.loads(ifile.read())
+        else:
+            with open(ifpath, 'r') as ifile:
+                network_def = json.load(ifile)
 
         self.parse(network_def)
 
@@ -381,6 +511,9 @@ class OutputPortNet:
         '''
         Read from a dictionary loaded from json
 
+        The flows and servers of "network_def" are not copied: they are converted in place and kept by this object,
+        pass a copy if the dictionary is still used afterwards
+
         1. network information:
           - a dict stores general network information
           - Or default values of parameters
@@ -413,9 +546,23 @@ class OutputPortNet:
         }
 
         # Get server name mapping
-        server_name_index_table = dict(zip([s["name"] for s in network_def["servers"]], range(len(network_def["servers"]))))
+        server_name_index_table = dict()
+        for sid, ser in enumerate(network_def["servers"]):
+            if ser["name"] in server_name_index_table:
+                raise ValueError(f"Server name \"{ser['name']}\" is defined multiple times")
+            server_name_index_table[ser["name"]] = sid
         # Initialize adjacency matrix
         self.adjacency_mat = np.zeros((len(server_name_index_table), len(server_name_index_table)), dtype=np.int8)
+        # the links of all paths, written into the adjacency matrix at once after loading the flows
+        link_from = []
+        link_to = []
+
+        # network defaults of the flows and servers, looked up once for all of them
+        default_arrival_curve = network_def["network"].get("arrival_curve", None)
+        default_max_pkt_len = network_def["network"].get("max_packet_length", None)
+        default_min_pkt_len = network_def["network"].get("min_packet_length", None)
+        default_service_curve = network_def["network"].get("service_curve", None)
+        default_capacity = network_def["network"].get("capacity", None)
 
         ## Load flows
         self.flows = []
@@ -431,6 +578,8 @@ class OutputPortNet:
 
             path_in_idx, is_dummy = self._register_path(path_in_name, server_name_index_table, flow_name)
             fl["path"] = path_in_idx
+            link_from.extend(path_in_idx[:-1])
+            link_to.extend(path_in_idx[1:])
             if is_dummy:
                 continue
 
@@ -440,9 +589,10 @@ class OutputPortNet:
                 path_name = mpath.get("name", f"p{mpath_idx+1}")
                 path_in_idx, is_dummy = self._register_path(mpath["path"], server_name_index_table, flow_name)
                 fl["multicast"][mpath_idx] = {"name": path_name, "path": path_in_idx}
+                link_from.extend(path_in_idx[:-1])
+                link_to.extend(path_in_idx[1:])
 
             ## Check arrival curve syntax
-            default_arrival_curve = network_def["network"].get("arrival_curve", None)
             arrival_curve = fl.get("arrival_curve", default_arrival_curve)
             if arrival_curve is None:
                 raise ValueError(f"No arrival curve found for flow {flow_name}")
@@ -465,7 +615,6 @@ class OutputPortNet:
             # maximum packet length:
             # it tries to find a local definition, if locally not defined, use the network default,
             # if network default is still not defined, use the maximum burst among all bursts
-            default_max_pkt_len = network_def["network"].get("max_packet_length", None)
             max_pkt_len = fl.get("max_packet_length", default_max_pkt_len)
             if max_pkt_len is not None:
                 max_pkt_len = try_raise(f"Parsing flows.max_packet_length of \"{flow_name}\"", max_pkt_len, self._convert_unit, max_pkt_len, unit["data"], "data")
@@ -476,7 +625,6 @@ class OutputPortNet:
             # minimum packet length:
             # it tries to find a local definition, if locally not defined, use the network default,
             # if network default is still not defined, use the minimum burst among all bursts
-            default_min_pkt_len = network_def["network"].get("min_packet_length", None)
             min_pkt_len = fl.get("min_packet_length", default_min_pkt_len)
             if min_pkt_len is not None:
                 min_pkt_len = try_raise(f"Parsing flows.min_packet_length of \"{flow_name}\"", min_pkt_len, self._convert_unit, min_pkt_len, unit["data"], "data")
@@ -486,6 +634,14 @@ class OutputPortNet:
 
             self.flows.append(fl)
 
+        # Construct adjacency matrix
+        self.adjacency_mat[link_from, link_to] = 1
+
+        # Flatten the flow paths for the aggregated arrival rates
+        self._flow_rates = np.fromiter((fl["arrival_curve"]["rates"][0] for fl in self.flows), dtype=np.float64, count=len(self.flows))
+        self._flat_paths = np.array([ser_id for fl in self.flows for ser_id in fl["path"]], dtype=np.intp)
+        self._flat_path_rates = np.repeat(self._flow_rates, [len(fl["path"]) for fl in self.flows])
+
         ## Load servers
         self.servers = []
         for ser in network_def["servers"]:
@@ -505,7 +661,6 @@ class OutputPortNet:
             }
             
             # assertion of arrival curve definition
-            default_service_curve = network_def["network"].get("service_curve", None)
             service_curve = ser.get("service_curve", default_service_curve)
             if service_curve is None:
                 raise ValueError(f"No service curve found for server {ser_name}")
@@ -523,7 +678,6 @@ class OutputPortNet:
             # Capacity #
             ############
             # Default capacity is the maximum service rate
-            default_capacity = network_def["network"].get("capacity", None)
             capacity = ser.get("capacity", default_capacity)
             if capacity is None:
                 capacity = max(service_curve["rates"])
@@ -537,6 +691,9 @@ class OutputPortNet:
             ser["capacity"] = capacity
 
             self.servers.append(ser)
+
+        self._ser_rates = np.fromiter((ser["service_curve"]["rates"][0] for ser in self.servers), dtype=np.float64, count=len(self.servers))
+        self._ser_names = [ser.get("name", f"s_{idx}") for idx, ser in enumerate(self.servers)]
             
     
     def dump_json(self, ofile:str) -> None:
@@ -544,37 +701,39 @@ class OutputPortNet:
         Dump the file into a json
         '''
         # manage multicast flows
+        # the flows are only written, so each path is a shallow copy of the flow with its own name and path
         flows = list()
         for fl in self.flows:
-            fl = deepcopy(fl)
             if "multicast" not in fl:
                 flows.append(fl)
                 continue
 
             flow_name = fl["name"]
-            multicast = fl.pop("multicast")
+            unicast_fl = {key: value for key, value in fl.items() if key not in ("multicast", "path_name")}
 
             # main path
-            path_name = fl.pop("path_name")
-            fl["name"] = f"{flow_name}#{path_name}"
-            flows.append(deepcopy(fl))
+            flows.append({**unicast_fl, "name": f"{flow_name}#{fl['path_name']}"})
 
             # multicast paths
-            for mpath in multicast:
-                path_name = mpath["name"]
-                fl["name"] = f"{flow_name}#{path_name}"
-                fl["path"] = mpath["path"]
-                flows.append(deepcopy(fl))
+            for mpath in fl["multicast"]:
+                flows.append({**unicast_fl, "name": f"{flow_name}#{mpath['name']}", "path": mpath["path"]})
 
         # dump results
         out_dict = {
             "network": self.network_info,
-            "adjacency_matrix": self.adjacency_mat.tolist(),
+            "adjacency_matrix": self.adjacency_mat,
             "flows": flows,
             "servers": self.servers
         }
-        with open(ofile, 'w') as f:
-            json.dump(out_dict, f, indent=4)
+        # orjson only supports 2-space indentation, the json fallback keeps the same layout
+        if orjson is not None:
+            # orjson writes the adjacency matrix directly from the array
+            with open(ofile, 'wb') as f:
+                f.write(orjson.dumps(out_dict, option=orjson.OPT_INDENT_2|orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            out_dict["adjacency_matrix"] = self.adjacency_mat.tolist()
+            with open(ofile, 'w') as f:
+                json.dump(out_dict, f, indent=2)
 
     def _register_path(self, path_in_name:list, server_name_index_table:dict, flow_name:str) -> tuple:
         '''
@@ -595,24 +754,25 @@ class OutputPortNet:
 
         # path defined as a list of server indices, server index is the order defined in server list
         path_in_idx = [None]*len(path_in_name)
+        # servers already on the path, to stop at the first recurring server
+        visited = set()
         for sid, sname in enumerate(path_in_name):
             if sname not in server_name_index_table:
                 raise RuntimeError(f"Server name \"{sname}\" written in flow \"{flow_name}\" is not defined")
-            path_in_idx[sid] = server_name_index_table[sname]
+            server_idx = server_name_index_table[sname]
+
+            ## Check if it's a valid path
+            # 1. no recurring server along the path
+            if server_idx in visited:
+                raise RuntimeError(f"Skip flow {flow_name} due to recurring server in its path: {path_in_name}")
+            visited.add(server_idx)
+            path_in_idx[sid] = server_idx
 
-        ## Check if it's a valid path
-        # 1. no recurring server along the path
-        if len(path_in_idx) != len(set(path_in_idx)):
-            raise RuntimeError(f"Skip flow {flow_name} due to recurring server in its path: {path_in_name}")
         # 2. non-empty path
         if len(path_in_idx) <= 0:
             warnings.warn(f"Skip flow {flow_name} because its path is empty, you may delete this flow")
             flow_is_dummy = True
 
-        # Construct adjacency matrix
-        for sid in range(len(path_in_idx)-1):
-            self.adjacency_mat[path_in_idx[sid], path_in_idx[sid+1]] = 1
-
         return path_in_idx, flow_is_dummy
 
     def _assert_mandatory_fields(self, data:dict, subfields:list=[]) -> None:
@@ -624,32 +784,30 @@ class OutputPortNet:
         data: the data to be check
         subfields: a list of keywords to check, to check field defined in mandatory_entries["network"], the subfields is ["network"]
         '''
-        # Access the field for check
-        check_field = deepcopy(self._mandatory_entries)
-        for f in subfields:
-            check_field = check_field[f]
-
-        # still have deeper fields to check
-        if type(check_field) is dict:
-            # Check all fields stored of the current layer
-            for field, ftype in check_field.items():
-                if field not in data:
-                    raise AttributeError("No \"{missing}\" object is defined in \"{subfd}\" of data {dt}\n A \"{subfd}\" object in network description file must have attributes {must_have}"\
-                                        .format(missing=field, subfd='.'.join(subfields), dt=data, must_have=list(check_field.keys())))
-                # Explore deeper laters
-                if type(ftype) is not type:
-                    # if it's a list, we make sure all entries inside the list is good
-                    if type(data[field]) is list:
-                        for sf in data[field]:
-                            try:
-                                self._assert_mandatory_fields(sf, [*subfields, field])
-                            except Exception as e:
-                                raise AttributeError("Missing mandatory field in \"{fields}\" of data {dt} ".format(fields="->".join([*subfields, field]), dt=sf)) from e
-                    else:
+        # Fields of the current layer, as (field name, whether it has deeper fields to check)
+        check_fields = self._mandatory_schema.get(tuple(subfields))
+        if check_fields is None:
+            return
+
+        # Check all fields stored of the current layer
+        for field, is_nested in check_fields:
+            if field not in data:
+                raise AttributeError("No \"{missing}\" object is defined in \"{subfd}\" of data {dt}\n A \"{subfd}\" object in network description file must have attributes {must_have}"\
+                                    .format(missing=field, subfd='.'.join(subfields), dt=data, must_have=[f for f, _ in check_fields]))
+            # Explore deeper laters
+            if is_nested:
+                # if it's a list, we make sure all entries inside the list is good
+                if type(data[field]) is list:
+                    for sf in data[field]:
                         try:
-                            self._assert_mandatory_fields(data[field], [*subfields, field])
+                            self._assert_mandatory_fields(sf, [*subfields, field])
                         except Exception as e:
-                            raise AttributeError("Missing mandatory field in \"{fields}\" of data {dt} ".format(fields="->".join([*subfields, field]), dt=data[field])) from e
+                            raise AttributeError("Missing mandatory field in \"{fields}\" of data {dt} ".format(fields="->".join([*subfields, field]), dt=sf)) from e
+                else:
+                    try:
+                        self._assert_mandatory_fields(data[field], [*subfields, field])
+                    except Exception as e:
+                        raise AttributeError("Missing mandatory field in \"{fields}\" of data {dt} ".format(fields="->".join([*subfields, field]), dt=data[field])) from e
                             
                 
     def _convert_unit(self, data:Union[float,Iterable], written_unit:str, unit_type:str) -> Union[float,list]:
@@ -679,32 +837,55 @@ class OutputPortNet:
 
         if written_unit is None:
             written_unit = ''
+        unit_type = unit_type.lower()
+        default_unit = self.base_unit[unit_type]
+        # numbers written in the default unit are kept as they are
+        is_default_unit = written_unit in ('', default_unit)
 
         # pure number : use the locally defined unit
         if is_number(data):
+            if is_default_unit:
+                return float(data)
+            factors = _unit_multiplier(written_unit, unit_type, default_unit)
+            if factors is not None:
+                mtp, unit_value, trg = factors
+                return float(data) * mtp * unit_value / trg
             data_with_unit = "{num}{unit}".format(num=data, unit=written_unit)
             try:
-                return parse_func(data_with_unit, self.base_unit[unit_type.lower()])
+                return parse_func(data_with_unit, default_unit)
             except ValueError as e:
                 raise ValueError(f"Error trying to convert with unit \"{written_unit}\"") from e
 
         # already with unit : use the unit written in the string
         elif type(data) is str:
             try:
-                return parse_func(data, self.base_unit[unit_type.lower()])
+                return _parse_num_unit(data, unit_type, default_unit)
             except ValueError as e:
                 raise ValueError(f"Error trying to convert \"{data}\"") from e
 
 
         # should be an iterable
         else:
+            factors = (1, 1, 1.0) if is_default_unit else _unit_multiplier(written_unit, unit_type, default_unit)
+            if factors is not None:
+                mtp, unit_value, trg = factors
+                # homogeneous numbers : convert all of them at once
+                if type(data) in (list, tuple) and all(type(d) in (int, float) for d in data):
+                    if is_default_unit:
+                        return [float(d) for d in data]
+                    if len(data) <= self._small_curve_len:
+                        return [float(d) * mtp * unit_value / trg for d in data]
+                    return (np.asarray(data, dtype=np.float64) * mtp * unit_value / trg).tolist()
             output = []
             for d in data:
                 # pure number : use the locally defined unit
                 if is_number(d):
+                    if factors is not None:
+                        output.append(float(d) * mtp * unit_value / trg)
+                        continue
                     data_with_unit = "{num}{unit}".format(num=d, unit=written_unit)
                     try:
-                        output.append(parse_func(data_with_unit, self.base_unit[unit_type.lower()]))
+                        output.append(parse_func(data_with_unit, default_unit))
                     except ValueError as e:
                         raise ValueError(f"Error trying to convert with unit \"{written_unit}\"") from e
 
@@ -712,7 +893,7 @@ class OutputPortNet:
                 # already with unit : use the unit written in the string
                 elif type(d) is str:
                     try:
-                        output.append(parse_func(d, self.base_unit[unit_type.lower()]))
+                        output.append(_parse_num_unit(d, unit_type, default_unit))
                     except ValueError as e:
                         raise ValueError(f"Error trying to convert \"{d}\"") from e
 
@@ -773,65 +954,78 @@ class OutputPortNet:
         # increasing bursts and decreasing rates; for service curves, all rate-latency
         # curves are written as increasing latencies and increasing rates.
 
-        # rearrange based on bursts in increasing order
-        order = np.argsort(curve[attr_name])
-        bur_lat = np.array(curve[attr_name])[order]
-        rates = np.array(curve["rates"])[order]
+        # Small curves (the common case) are cheaper to sort and check as python lists
+        if len(curve["rates"]) <= self._small_curve_len:
+            self._assert_small_curve(curve, attr_name, attr_type=="flow")
+            return
 
-        # Check the curve is concave
-        valid_curve_points = np.ones_like(bur_lat, dtype=bool)
-        prev_bur_lat = 0
-        prev_rate  = np.inf if attr_type=="flow" else 0
-        for i in range(len(bur_lat)):
-            curr_bur_lat = bur_lat[i]
-            curr_rate  = rates[i]
-
-            # we sort the curves by burst/latency in increasing order,
-            # so we won't have smaller burst/latency value than the previous one.
-            # Thus we consider 2 cases: equal and greater
-
-            # burst/latency is equal, 
-            # choose the smaller rate for token-bucket
-            # choose the larger rate for rate-latency
-            if curr_bur_lat == prev_bur_lat:
-                if attr_type == "flow":
-                    if curr_rate < prev_rate:
-                        valid_curve_points[i-1] = False
-                    else:
-                        valid_curve_points[i] = False
-                        continue    # don't need to update previous value
-                else: # attr_type == "server"
-                    if curr_rate > prev_rate:
-                        valid_curve_points[i-1] = False
-                    else:
-                        valid_curve_points[i] = False
-                        continue    # don't need to update previous value
-
-            # arrival curve: if burst is larger but rate is also larger -> ignore
-            # service curve: if latency is larger but rate is also smaller -> ignore
-            elif curr_rate>=prev_rate and attr_type=="flow" or curr_rate<=prev_rate and attr_type=="server":
-                valid_curve_points[i] = False
-                continue    # don't need to update previous value
+        # rearrange based on bursts in increasing order,
+        # points of equal burst/latency are ordered with the preferred one first:
+        # the smaller rate for token-bucket, the larger rate for rate-latency
+        bur_lat = np.array(curve[attr_name])
+        rates = np.array(curve["rates"])
+        order = np.lexsort((rates if attr_type=="flow" else -rates, bur_lat))
+        bur_lat = bur_lat[order]
+        rates = rates[order]
 
-            
-            prev_bur_lat = curr_bur_lat
-            prev_rate  = curr_rate
+        # Check the curve is concave
+        # A point is kept if it's the first of its burst/latency and
+        # arrival curve: its rate is smaller than all the rates of smaller bursts
+        # service curve: its rate is larger than all the rates of smaller latencies
+        valid_curve_points = np.ones(len(bur_lat), dtype=bool)
+        valid_curve_points[1:] = bur_lat[1:] != bur_lat[:-1]
+        if attr_type == "flow":
+            prev_rates = np.concatenate(([np.inf], np.minimum.accumulate(rates)[:-1]))
+            valid_curve_points &= rates < prev_rates
+        else:
+            prev_rates = np.concatenate(([0], np.maximum.accumulate(rates)[:-1]))
+            valid_curve_points &= rates > prev_rates
 
         # Update arrival curve
         curve[attr_name] = bur_lat[valid_curve_points].tolist()
         curve["rates"]   = rates[valid_curve_points].tolist()
 
+    def _assert_small_curve(self, curve:dict, attr_name:str, is_arrival:bool) -> None:
+        '''
+        Remove the redundent segments of a curve with few points and rewrite them in-order, same as "_assert_curve" but on python lists
+
+        Inputs:
+        -------------
+        curve      : [dict] contains either "latencies" and "rates" as a service curve, 
+                     or "bursts" and "rates" as an arrival curve
+        attr_name  : [str] "latencies" or "bursts"
+        is_arrival : [bool] true if the curve is an arrival curve
+        '''
+        # equal bursts/latencies are ordered with the preferred rate first
+        if is_arrival:
+            points = sorted(zip(curve[attr_name], curve["rates"]))
+        else:
+            points = sorted(zip(curve[attr_name], curve["rates"]), key=lambda p: (p[0], -p[1]))
+
+        bur_lat = []
+        rates = []
+        prev_rate = float("inf") if is_arrival else 0
+        for curr_bur_lat, curr_rate in points:
+            # only the first point of a burst/latency is considered
+            if len(bur_lat) > 0 and curr_bur_lat == bur_lat[-1]:
+                continue
+            if curr_rate < prev_rate and is_arrival or curr_rate > prev_rate and not is_arrival:
+                bur_lat.append(curr_bur_lat)
+                rates.append(curr_rate)
+                prev_rate = curr_rate
+
+        curve[attr_name] = bur_lat
+        curve["rates"]   = rates
+
     
     def get_gif(self)->nx.DiGraph:
         '''
         Return a Graph induced by Flows as a networkx directed graph
         '''
+        # consecutive steps of each path, the edges shared by several flows are kept once in order of appearance
+        edges = dict.fromkeys(edge for fl in self.flows for edge in zip(fl["path"], fl["path"][1:]))
         G = nx.DiGraph()
-        for fl in self.flows:
-            prev_step = fl["path"][0]
-            for step in fl["path"][1:]:
-                G.add_edge(prev_step, step)
-                prev_step = step
+        G.add_edges_from(edges)
 
         return G
 
@@ -839,7 +1033,8 @@ class OutputPortNet:
         '''
         Tell if the current network is cyclic
         '''
-        return len(list(nx.simple_cycles(self.get_gif()))) > 0
+        # a topological sort finds a cycle without listing all of them
+        return not nx.is_directed_acyclic_graph(self.get_gif())
 
     def get_utility(self) -> dict:
         '''
@@ -850,19 +1045,11 @@ class OutputPortNet:
         ---------
         utility : dictionary of key=server-names ; value=utility
         '''
-        # aggregate arrival rate at each server, key=server_name, value=rate
-        agg_arr_rate = np.zeros(len(self.servers))
-
-        for fl in self.flows:
-            for ser_id in fl["path"]:
-                agg_arr_rate[ser_id] += fl["arrival_curve"]["rates"][0]
-
-        ser_rates = np.zeros(len(self.servers))
-        ser_names = [None]*len(self.servers)
-        for idx, serv in enumerate(self.servers):
-            ser_rates[idx] = serv["service_curve"]["rates"][0]
-            ser_names[idx] = serv.get("name", f"s_{idx}")
+        # aggregate arrival rate at each server, indexed by server id
+        # weighted bincount is a single compiled loop, the rates of all flows passing a server are summed in the order of the flows
+        agg_arr_rate = np.bincount(self._flat_paths, weights=self._flat_path_rates, minlength=len(self.servers))
 
-        utility = dict(zip(ser_names, agg_arr_rate/ser_rates))
+        # unbox all utilities at once into python floats
+        utility = dict(zip(self._ser_names, (agg_arr_rate/self._ser_rates).tolist()))
         
         return utility
@@ -1,8 +1,14 @@
 
 import xml.etree.ElementTree as ET
-import xml.dom.minidom as md
 import json
 from copy import deepcopy
+import numpy as np
+
+# orjson is optional, it reads and writes large networks much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Solve path issue
 import os.path
@@ -234,6 +240,7 @@ class NetworkScriptHandler:
 
         # Count the number of output ports
         port_list = self.phy_net.get_output_ports(ignore_dummy=True)
+        port_index = self._index_portlist(port_list)
         
         # Construct servers            
         servers = list()    # servers in output-port abstractions
@@ -270,7 +277,7 @@ class NetworkScriptHandler:
             # Get flow path
             path = []
             for step in fl_data["path"]:
-                port_idx = self._get_portlist_index(port_list, step["node"], step["port"])
+                port_idx = port_index.get((step["node"], step["port"]))
                 if port_idx is not None:
                     path.append(servers[port_idx]["name"])
 
@@ -283,7 +290,7 @@ class NetworkScriptHandler:
 
                     multicast_path = list()
                     for step in mpath["path"]:
-                        port_idx = self._get_portlist_index(port_list, step["node"], step["port"])
+                        port_idx = port_index.get((step["node"], step["port"]))
                         if port_idx is not None:
                             multicast_path.append(servers[port_idx]["name"])
                     multicast[-1]["path"] = multicast_path
@@ -313,8 +320,13 @@ class NetworkScriptHandler:
             "servers": servers
         }
         if ofpath is not None:
-            with open(ofpath, "w") as ofile:
-                json.dump(json_out, ofile, indent=4)
+            # orjson only supports 2-space indentation, the json fallback keeps the same layout
+            if orjson is not None:
+                with open(ofpath, "wb") as ofile:
+                    ofile.write(orjson.dumps(json_out, option=orjson.OPT_INDENT_2|orjson.OPT_SERIALIZE_NUMPY))
+            else:
+                with open(ofpath, "w") as ofile:
+                    json.dump(json_out, ofile, indent=2)
 
         return json_out
 
@@ -471,17 +483,17 @@ class NetworkScriptHandler:
 
     
         # Connect all links defined on adjacency matrix
-        for r, row in enumerate(self.op_net.adjacency_mat):
-            for c, val in enumerate(row):
-                if (val>0):
-                    link_info = {
-                        "from": server_names[r],
-                        "to": server_names[c],
-                        "fromPort": port_names[r],
-                        "toPort": port_names[c],
-                        "name": f"lk:{server_names[r]}_{port_names[r]}-{server_names[c]}_{port_names[c]}"
-                    }
-                    ET.SubElement(root, "link", link_info)
+        # only visit the links, in row-major order
+        link_rows, link_cols = np.nonzero(np.asarray(self.op_net.adjacency_mat) > 0)
+        for r, c in zip(link_rows.tolist(), link_cols.tolist()):
+            link_info = {
+                "from": server_names[r],
+                "to": server_names[c],
+                "fromPort": port_names[r],
+                "toPort": port_names[c],
+                "name": f"lk:{server_names[r]}_{port_names[r]}-{server_names[c]}_{port_names[c]}"
+            }
+            ET.SubElement(root, "link", link_info)
                 
         ################
         # Define flows #
@@ -542,13 +554,12 @@ class NetworkScriptHandler:
         #################
         # Dump XML file #
         #################
-        dom = md.parseString(ET.tostring(root))
-        xml_string = dom.toprettyxml()
-        part1, part2 = xml_string.split('?>')
-
-        with open(ofpath, 'w') as xfile:
-            xfile.write(part1 + 'encoding=\"{}\"?>\n'.format(m_encoding) + part2)
-            xfile.close()
+        # indent the tree in place and write it once, without parsing the serialized tree again
+        ET.indent(root, space="\t")
+        with open(ofpath, 'w', encoding=m_encoding) as xfile:
+            xfile.write('<?xml version="1.0" encoding="{}"?>\n'.format(m_encoding))
+            ET.ElementTree(root).write(xfile, encoding="unicode")
+            xfile.write("\n")
 
 
     def is_cyclic(self, choose_op_net:bool=True)->bool:
@@ -575,7 +586,13 @@ class NetworkScriptHandler:
         '''
         if filename.endswith("xml"):
             # Load the information
-            xml_root = ET.parse(filename)
+            # stream the file and only keep the "network" elements, the others are cleared once parsed
+            xml_root = ET.Element("elements")
+            for _, elem in ET.iterparse(filename):
+                if elem.tag == "network":
+                    xml_root.append(elem)
+                else:
+                    elem.clear()
             net = PhysicalNet()
             net.parse_network(xml_root)
             
@@ -583,11 +600,15 @@ class NetworkScriptHandler:
 
         elif filename.endswith("json"):
             # Load the information
-            with open(filename, 'r') as ifile:
-                network_def = json.load(ifile)
-                if "network" not in network_def:
-                    return default
-                return network_def["network"].get(target_attr, default)
+            if orjson is not None:
+                with open(filename, 'rb') as ifile:
+                    network_def = orjson.loads(ifile.read())
+            else:
+                with open(filename, 'r') as ifile:
+                    network_def = json.load(ifile)
+            if "network" not in network_def:
+                return default
+            return network_def["network"].get(target_attr, default)
 
         return default
 
@@ -620,11 +641,12 @@ class NetworkScriptHandler:
         
 
 
-    def _get_portlist_index(self, portlist:list, physical_name:str, port:str)->int:
+    def _index_portlist(self, portlist:list)->dict:
         '''
-        return the index in a portlist, used when parsing physical network
+        return the index in a portlist of each port, used when parsing physical network
+        key=(physical node name, port) ; value=index of the first port matching them
         '''
+        port_index = dict()
         for i, port_info in enumerate(portlist):
-            if port_info["physical_node"] == physical_name and port_info["port"] == port:
-                return i
-        return None
\ No newline at end of file
+            port_index.setdefault((port_info["physical_node"], port_info["port"]), i)
+        return port_index
\ No newline at end of file
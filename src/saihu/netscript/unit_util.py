@@ -657,7 +657,7 @@ def decide_min_multiplier(x:Iterable, unit:str=None)->str:
     -------
     min_mul : the minimum suitable multiplier for all elements in x
     '''
-    if all([elem is None for elem in x]):
+    if all(elem is None for elem in x):
         return ''
     min_mul = MAX_MULTIPLIER
     for elem in x:
@@ -21,6 +21,6 @@ setup(
         "Operating System :: OS Independent",
         "Natural Language :: English",
     ],
-    install_requires=["numpy", "matplotlib", "pulp", "networkx", "mdutils"],
+    install_requires=["numpy", "matplotlib", "pulp", "networkx"],
     python_requires=">=3.9",
 )